@@ -0,0 +1,331 @@
+import numpy as np
+import pandas as pd
+from io import BytesIO
+
+from gold_publisher import load_manifest
+from layer_io import BUCKET_NAME, s3_client
+
+# Configuration
+STATE_KEY = 'gold/_state/anomaly_state.npz'
+
+# Streaming statistics are kept per platform x device, per metric
+SEGMENT_COLUMNS = ['ad_platform', 'device_type']
+METRICS = ['ctr', 'cost_per_click', 'conversion_rate']
+
+# Which direction of movement is bad for each metric
+BAD_DIRECTION = {'ctr': 'drop', 'cost_per_click': 'spike', 'conversion_rate': 'drop'}
+
+# Scoring
+Z_THRESHOLD = 3.0
+EWMA_ALPHA = 0.2
+MIN_HISTORY = 5          # observations before a segment is scored
+MIN_IMPRESSIONS = 100    # ignore segment-days too small to be meaningful
+
+# How many applied batch ids to remember (protects against double counting)
+MAX_BATCH_HISTORY = 500
+
+# Event dates kept in the published anomalies table
+HISTORY_DAYS = 90
+
+class AnomalyState:
+    """
+    Compact streaming statistics: one row per segment, one column per metric
+
+    count/mean/m2 are Welford's running mean and variance; ewma/ewm_var an
+    exponentially weighted mean and variance that follow recent behaviour.
+    Each segment-day is one observation, so state size never depends on rows.
+    last_day holds the newest event date (ordinal) folded in per segment;
+    batches overlap by several days, and older dates are never folded twice.
+    """
+
+    FIELDS = ['count', 'mean', 'm2', 'ewma', 'ewm_var']
+
+    def __init__(self):
+        self.segments = []
+        self.segment_index = {}
+        self.stats = {field: np.zeros((0, len(METRICS))) for field in self.FIELDS}
+        self.last_day = np.zeros(0, dtype=np.int64)
+        self.applied_batches = []
+
+    def segment_ids(self, keys):
+        """
+        Map segment keys to state rows, adding rows for new segments
+        """
+        new_keys = [key for key in dict.fromkeys(keys) if key not in self.segment_index]
+        if new_keys:
+            for key in new_keys:
+                self.segment_index[key] = len(self.segments)
+                self.segments.append(key)
+            for field in self.FIELDS:
+                self.stats[field] = np.pad(self.stats[field], ((0, len(new_keys)), (0, 0)))
+            self.last_day = np.pad(self.last_day, (0, len(new_keys)), constant_values=-1)
+        return np.array([self.segment_index[key] for key in keys], dtype=np.int64)
+
+    def score(self, rows, values):
+        """
+        z-scores of one day's values (segments x metrics) against history
+        NaN where there is not enough history
+        """
+        count = self.stats['count'][rows]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std = np.sqrt(self.stats['m2'][rows] / (count - 1))
+            zscore = (values - self.stats['mean'][rows]) / std
+            ewma_z = (values - self.stats['ewma'][rows]) / np.sqrt(self.stats['ewm_var'][rows])
+
+        enough = count >= MIN_HISTORY
+        zscore = np.where(enough & (std > 0), zscore, np.nan)
+        ewma_z = np.where(enough & (self.stats['ewm_var'][rows] > 0), ewma_z, np.nan)
+        return zscore, ewma_z
+
+    def update(self, rows, values):
+        """
+        Fold one day's values into the running statistics (NaN values are skipped)
+        """
+        present = ~np.isnan(values)
+        x = np.where(present, values, 0.0)
+
+        count = self.stats['count'][rows] + present
+        mean = self.stats['mean'][rows]
+        delta = np.where(present, x - mean, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = mean + np.where(present, delta / count, 0.0)
+        m2 = self.stats['m2'][rows] + delta * np.where(present, x - mean, 0.0)
+
+        first = present & (count == 1)
+        ewma = self.stats['ewma'][rows]
+        diff = np.where(present, x - ewma, 0.0)
+        increment = EWMA_ALPHA * diff
+        ewm_var = np.where(present, (1 - EWMA_ALPHA) * (self.stats['ewm_var'][rows] + diff * increment),
+                           self.stats['ewm_var'][rows])
+        ewma = ewma + increment
+        ewma = np.where(first, x, ewma)
+        ewm_var = np.where(first, 0.0, ewm_var)
+
+        self.stats['count'][rows] = count
+        self.stats['mean'][rows] = mean
+        self.stats['m2'][rows] = m2
+        self.stats['ewma'][rows] = ewma
+        self.stats['ewm_var'][rows] = ewm_var
+
+    def to_bytes(self):
+        """
+        Serialize the state as an .npz archive
+        """
+        buffer = BytesIO()
+        np.savez_compressed(
+            buffer,
+            segments=np.array(self.segments, dtype=str).reshape(-1, len(SEGMENT_COLUMNS)),
+            applied_batches=np.array(self.applied_batches, dtype=str),
+            last_day=self.last_day,
+            **self.stats
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Rebuild the state from an .npz archive
+        """
+        archive = np.load(BytesIO(data), allow_pickle=False)
+        state = cls()
+        state.segments = [tuple(row) for row in archive['segments'].tolist()]
+        state.segment_index = {key: i for i, key in enumerate(state.segments)}
+        state.applied_batches = archive['applied_batches'].tolist()
+        state.stats = {field: archive[field] for field in cls.FIELDS}
+        if 'last_day' in archive.files:
+            state.last_day = archive['last_day']
+        else:
+            state.last_day = np.full(len(state.segments), -1, dtype=np.int64)
+        return state
+
+def load_state(bucket=BUCKET_NAME):
+    """
+    Load anomaly statistics from S3 (empty state on first run)
+    """
+    try:
+        obj = s3_client.get_object(Bucket=bucket, Key=STATE_KEY)
+    except s3_client.exceptions.NoSuchKey:
+        print(" No anomaly state found, starting fresh")
+        return AnomalyState()
+    return AnomalyState.from_bytes(obj['Body'].read())
+
+def save_state(state, bucket=BUCKET_NAME):
+    """
+    Persist anomaly statistics to S3
+    """
+    s3_client.put_object(Bucket=bucket, Key=STATE_KEY, Body=state.to_bytes())
+
+def column_codes(values):
+    """
+    Integer code per row and the values (as str) the codes point to
+    Categoricals (dictionary-encoded in Bronze) reuse their codes; other
+    columns are factorized. Missing values get their own 'nan' code.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        levels = values.cat.categories.astype(str).to_numpy(dtype=object)
+        if (codes < 0).any():
+            codes = codes.astype(np.int64)
+            codes[codes < 0] = len(levels)
+            levels = np.append(levels, 'nan')
+        return codes, levels
+
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return codes, np.asarray(uniques).astype(str)
+
+def combined_codes(df, columns):
+    """
+    Code each column on its own and combine the integer codes
+    (much cheaper than factorizing row tuples)
+    Returns (code per row, values per column)
+    """
+    codes, values = column_codes(df[columns[0]])
+    combined = codes.astype(np.int64)
+    levels = [values]
+    for col in columns[1:]:
+        codes, values = column_codes(df[col])
+        combined *= len(values)
+        combined += codes
+        levels.append(values)
+    return combined, levels
+
+def daily_segment_metrics(df, state):
+    """
+    Per (event_date, segment) sums with bincount, then the metric ratios
+    Returns (dates, segment rows, impressions, values: observations x metrics)
+    """
+    cell, levels = combined_codes(df, ['event_date'] + SEGMENT_COLUMNS)
+
+    # Cells cover every combination of the column values; only observed ones are kept
+    shape = [len(level) for level in levels]
+    size = int(np.prod(shape))
+
+    def total(col):
+        return np.bincount(cell, weights=df[col].to_numpy(dtype=np.float64), minlength=size)
+
+    impressions = total('impressions')
+    clicks = total('clicks')
+    conversions = total('conversion')
+    spend = total('amount_spent')
+
+    observed = np.flatnonzero(np.bincount(cell, minlength=size))
+    impressions, clicks = impressions[observed], clicks[observed]
+    conversions, spend = conversions[observed], spend[observed]
+
+    parts = np.unravel_index(observed, shape)
+    days = levels[0][parts[0]]
+    keys = list(zip(*[level[part].tolist() for level, part in zip(levels[1:], parts[1:])]))
+    segment_rows = state.segment_ids(keys)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = np.column_stack([
+            np.where(impressions > 0, clicks / impressions * 100, np.nan),
+            np.where(clicks > 0, spend / clicks, np.nan),
+            np.where(clicks > 0, conversions / clicks * 100, np.nan)
+        ])
+
+    return days, segment_rows, impressions, values
+
+def detect_anomalies(df, bucket=BUCKET_NAME):
+    """
+    Score a Silver batch against the streaming statistics, then fold it in
+    Each event date is scored before it is added, in date order; segment-days
+    at or before a segment's last folded date were already scored and are skipped
+    Returns (anomalies DataFrame, updated state), or (None, None) if the batch
+    was not scored. The caller saves the state once the anomalies are published.
+    """
+    print("\nDetecting metric anomalies...")
+
+    if 'event_date' not in df.columns:
+        print(" Batch has no event_date, skipping anomaly detection")
+        return None, None
+
+    state = load_state(bucket)
+
+    batch_ids = []
+    if 'ingestion_batch_id' in df.columns:
+        batches = df['ingestion_batch_id']
+        if isinstance(batches.dtype, pd.CategoricalDtype):
+            # The categories are the batches the Bronze file was written with
+            batch_ids = batches.cat.categories.astype(str).tolist()
+        else:
+            batch_ids = pd.Series(batches.unique()).astype(str).tolist()
+        if all(batch_id in state.applied_batches for batch_id in batch_ids):
+            print(" Batch already applied, nothing to score")
+            return None, None
+
+    dates, rows, impressions, values = daily_segment_metrics(df, state)
+
+    found = []
+    scored = 0
+    for day in np.unique(dates):
+        if day == 'nan':
+            continue
+        ordinal = pd.Timestamp(day).toordinal()
+        mask = dates == day
+        mask[mask] = ordinal > state.last_day[rows[mask]]
+        if not mask.any():
+            continue
+        day_rows, day_values = rows[mask], values[mask]
+        state.last_day[day_rows] = ordinal
+        scored += len(day_rows)
+        zscore, ewma_z = state.score(day_rows, day_values)
+
+        # Small segment-days are neither scored nor allowed to skew the history
+        large = impressions[mask] >= MIN_IMPRESSIONS
+        flagged = ((np.abs(zscore) > Z_THRESHOLD) | (np.abs(ewma_z) > Z_THRESHOLD)) & large[:, None]
+
+        for i, j in zip(*np.nonzero(flagged)):
+            segment = state.segments[day_rows[i]]
+            metric = METRICS[j]
+            moved = 'spike' if day_values[i, j] > state.stats['mean'][day_rows[i], j] else 'drop'
+            found.append({
+                'event_date': day,
+                **dict(zip(SEGMENT_COLUMNS, segment)),
+                'metric': metric,
+                'value': day_values[i, j],
+                'expected': state.stats['mean'][day_rows[i], j],
+                'zscore': zscore[i, j],
+                'ewma': state.stats['ewma'][day_rows[i], j],
+                'ewma_zscore': ewma_z[i, j],
+                'direction': moved,
+                'severity': 'alert' if moved == BAD_DIRECTION[metric] else 'info',
+                'impressions': int(impressions[mask][i])
+            })
+
+        state.update(day_rows[large], day_values[large])
+
+    state.applied_batches = (state.applied_batches + batch_ids)[-MAX_BATCH_HISTORY:]
+
+    columns = ['event_date'] + SEGMENT_COLUMNS + [
+        'metric', 'value', 'expected', 'zscore', 'ewma', 'ewma_zscore',
+        'direction', 'severity', 'impressions'
+    ]
+    anomalies = pd.DataFrame(found, columns=columns).round(2)
+    if batch_ids:
+        anomalies['ingestion_batch_id'] = ';'.join(batch_ids)
+
+    alerts = (anomalies['severity'] == 'alert').sum()
+    print(f" Scored {scored} new segment-days ({len(dates) - scored} already folded), flagged {len(anomalies)} anomalies ({alerts} alerts)")
+    return anomalies, state
+
+def anomaly_history(anomalies, bucket=BUCKET_NAME):
+    """
+    Append a batch's anomalies to the published anomalies table
+    Keeps the last HISTORY_DAYS event dates; a segment-day scored again replaces its rows
+    """
+    entry = load_manifest(bucket)['tables'].get('anomalies')
+    if entry is not None:
+        obj = s3_client.get_object(Bucket=bucket, Key=entry['key'])
+        published = pd.read_csv(BytesIO(obj['Body'].read()),
+                                dtype={col: str for col in SEGMENT_COLUMNS + ['ingestion_batch_id']})
+        anomalies = pd.concat([published, anomalies], ignore_index=True)
+
+    history = anomalies.drop_duplicates(subset=['event_date'] + SEGMENT_COLUMNS + ['metric'], keep='last')
+
+    if len(history):
+        dates = pd.to_datetime(history['event_date'])
+        history = history[dates > dates.max() - pd.Timedelta(days=HISTORY_DAYS)]
+
+    print(f" Anomalies table holds {len(history)} rows")
+    return history.sort_values(['event_date'] + SEGMENT_COLUMNS + ['metric']).reset_index(drop=True)
@@ -2,6 +2,10 @@ CREATE DATABASE IF NOT EXISTS ad_campaign_analytics
 COMMENT 'Social Media Ad Campaign Performance Database'
 LOCATION 's3://ad-campaign-optimizer-2026/';
 
+--Gold tables point at gold/<table>/_symlink/, whose symlink.txt lists the
+--published snapshot file (see gold_publisher.py). Publishing replaces that
+--one file, so a table never shows a half-written or duplicated snapshot.
+
 --CREATING TABLE PLATFORM_PERFORMANCE
 CREATE EXTERNAL TABLE ad_campaign_analytics.platform_performance (
     ad_platform STRING,
@@ -25,8 +29,9 @@ CREATE EXTERNAL TABLE ad_campaign_analytics.platform_performance (
 )
 ROW FORMAT DELIMITED
 FIELDS TERMINATED BY ','
-STORED AS TEXTFILE
-LOCATION 's3://ad-campaign-optimizer-2026/gold/platform_performance/'
+STORED AS INPUTFORMAT 'org.apache.hadoop.hive.ql.io.SymlinkTextInputFormat'
+OUTPUTFORMAT 'org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat'
+LOCATION 's3://ad-campaign-optimizer-2026/gold/platform_performance/_symlink/'
 TBLPROPERTIES ('skip.header.line.count'='1');
 
 --TEST QUESRY:
@@ -40,7 +45,9 @@ CREATE EXTERNAL TABLE ad_campaign_analytics.executive_summary (
 )
 ROW FORMAT DELIMITED
 FIELDS TERMINATED BY ','
-LOCATION 's3://ad-campaign-optimizer-2026/gold/executive_summary/'
+STORED AS INPUTFORMAT 'org.apache.hadoop.hive.ql.io.SymlinkTextInputFormat'
+OUTPUTFORMAT 'org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat'
+LOCATION 's3://ad-campaign-optimizer-2026/gold/executive_summary/_symlink/'
 TBLPROPERTIES ('skip.header.line.count'='1');
 
 --DEVICE Performance
@@ -57,7 +64,9 @@ CREATE EXTERNAL TABLE ad_campaign_analytics.device_performance (
 )
 ROW FORMAT DELIMITED
 FIELDS TERMINATED BY ','
-LOCATION 's3://ad-campaign-optimizer-2026/gold/device_performance/'
+STORED AS INPUTFORMAT 'org.apache.hadoop.hive.ql.io.SymlinkTextInputFormat'
+OUTPUTFORMAT 'org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat'
+LOCATION 's3://ad-campaign-optimizer-2026/gold/device_performance/_symlink/'
 TBLPROPERTIES ('skip.header.line.count'='1');
 
 
@@ -74,7 +83,9 @@ CREATE EXTERNAL TABLE ad_campaign_analytics.day_performance (
 )
 ROW FORMAT DELIMITED
 FIELDS TERMINATED BY ','
-LOCATION 's3://ad-campaign-optimizer-2026/gold/day_of_week_performance/'
+STORED AS INPUTFORMAT 'org.apache.hadoop.hive.ql.io.SymlinkTextInputFormat'
+OUTPUTFORMAT 'org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat'
+LOCATION 's3://ad-campaign-optimizer-2026/gold/day_of_week_performance/_symlink/'
 TBLPROPERTIES ('skip.header.line.count'='1');
 
 
@@ -91,7 +102,208 @@ CREATE EXTERNAL TABLE ad_campaign_analytics.age_performance (
 )
 ROW FORMAT DELIMITED
 FIELDS TERMINATED BY ','
-LOCATION 's3://ad-campaign-optimizer-2026/gold/age_group_performance/'
+STORED AS INPUTFORMAT 'org.apache.hadoop.hive.ql.io.SymlinkTextInputFormat'
+OUTPUTFORMAT 'org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat'
+LOCATION 's3://ad-campaign-optimizer-2026/gold/age_group_performance/_symlink/'
+TBLPROPERTIES ('skip.header.line.count'='1');
+
+
+--ROLLING 7-DAY Performance (per platform x age group)
+CREATE EXTERNAL TABLE ad_campaign_analytics.rolling_7d_performance (
+    window_end DATE,
+    window_days INT,
+    ad_platform STRING,
+    age_group STRING,
+    campaigns INT,
+    impressions BIGINT,
+    clicks BIGINT,
+    conversion INT,
+    amount_spent DECIMAL(12,2),
+    conversion_value DECIMAL(12,2),
+    profit DECIMAL(12,2),
+    ctr DECIMAL(10,2),
+    conversion_rate DECIMAL(10,2),
+    cost_per_click DECIMAL(10,2),
+    roas DECIMAL(10,2),
+    roi_percentage DECIMAL(10,2)
+)
+ROW FORMAT DELIMITED
+FIELDS TERMINATED BY ','
+STORED AS INPUTFORMAT 'org.apache.hadoop.hive.ql.io.SymlinkTextInputFormat'
+OUTPUTFORMAT 'org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat'
+LOCATION 's3://ad-campaign-optimizer-2026/gold/rolling_7d_performance/_symlink/'
+TBLPROPERTIES ('skip.header.line.count'='1');
+
+
+--ROLLING 28-DAY Performance (per platform x age group)
+CREATE EXTERNAL TABLE ad_campaign_analytics.rolling_28d_performance (
+    window_end DATE,
+    window_days INT,
+    ad_platform STRING,
+    age_group STRING,
+    campaigns INT,
+    impressions BIGINT,
+    clicks BIGINT,
+    conversion INT,
+    amount_spent DECIMAL(12,2),
+    conversion_value DECIMAL(12,2),
+    profit DECIMAL(12,2),
+    ctr DECIMAL(10,2),
+    conversion_rate DECIMAL(10,2),
+    cost_per_click DECIMAL(10,2),
+    roas DECIMAL(10,2),
+    roi_percentage DECIMAL(10,2)
+)
+ROW FORMAT DELIMITED
+FIELDS TERMINATED BY ','
+STORED AS INPUTFORMAT 'org.apache.hadoop.hive.ql.io.SymlinkTextInputFormat'
+OUTPUTFORMAT 'org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat'
+LOCATION 's3://ad-campaign-optimizer-2026/gold/rolling_28d_performance/_symlink/'
+TBLPROPERTIES ('skip.header.line.count'='1');
+
+
+--ANOMALIES (anomaly_detection.py, written by transform_data.py)
+--History of the last 90 event dates: each run appends its batch, ingestion_batch_id tells batches apart
+CREATE EXTERNAL TABLE ad_campaign_analytics.anomalies (
+    event_date DATE,
+    ad_platform STRING,
+    device_type STRING,
+    metric STRING,
+    value DECIMAL(12,2),
+    expected DECIMAL(12,2),
+    zscore DECIMAL(10,2),
+    ewma DECIMAL(12,2),
+    ewma_zscore DECIMAL(10,2),
+    direction STRING,
+    severity STRING,
+    impressions BIGINT,
+    ingestion_batch_id STRING
+)
+ROW FORMAT DELIMITED
+FIELDS TERMINATED BY ','
+STORED AS INPUTFORMAT 'org.apache.hadoop.hive.ql.io.SymlinkTextInputFormat'
+OUTPUTFORMAT 'org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat'
+LOCATION 's3://ad-campaign-optimizer-2026/gold/anomalies/_symlink/'
+TBLPROPERTIES ('skip.header.line.count'='1');
+
+
+--SEGMENT RANKING (segment_ranking.py); segment_grouping names the dimensions used, others are 'ALL'
+CREATE EXTERNAL TABLE ad_campaign_analytics.segment_ranking (
+    segment_grouping STRING,
+    age_group STRING,
+    location STRING,
+    device_type STRING,
+    ad_platform STRING,
+    campaigns INT,
+    impressions BIGINT,
+    clicks BIGINT,
+    conversions INT,
+    spend DECIMAL(14,2),
+    revenue DECIMAL(14,2),
+    profit DECIMAL(14,2),
+    ctr DECIMAL(10,2),
+    conversion_rate DECIMAL(10,2),
+    roi_percentage DECIMAL(10,2),
+    roas DECIMAL(10,2),
+    rank_profit INT,
+    rank_roi_percentage INT,
+    rank_roas INT,
+    rank_conversion_rate INT,
+    rank_conversions INT
+)
+ROW FORMAT DELIMITED
+FIELDS TERMINATED BY ','
+STORED AS INPUTFORMAT 'org.apache.hadoop.hive.ql.io.SymlinkTextInputFormat'
+OUTPUTFORMAT 'org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat'
+LOCATION 's3://ad-campaign-optimizer-2026/gold/segment_ranking/_symlink/'
+TBLPROPERTIES ('skip.header.line.count'='1');
+
+--Top 100 per segment_grouping, metric and minimum impressions (0 / 100 / 1000 / 10000)
+CREATE EXTERNAL TABLE ad_campaign_analytics.segment_top_k (
+    metric STRING,
+    min_impressions INT,
+    heap_rank INT,
+    segment_grouping STRING,
+    age_group STRING,
+    location STRING,
+    device_type STRING,
+    ad_platform STRING,
+    campaigns INT,
+    impressions BIGINT,
+    clicks BIGINT,
+    conversions INT,
+    spend DECIMAL(14,2),
+    revenue DECIMAL(14,2),
+    profit DECIMAL(14,2),
+    ctr DECIMAL(10,2),
+    conversion_rate DECIMAL(10,2),
+    roi_percentage DECIMAL(10,2),
+    roas DECIMAL(10,2),
+    rank_profit INT,
+    rank_roi_percentage INT,
+    rank_roas INT,
+    rank_conversion_rate INT,
+    rank_conversions INT
+)
+ROW FORMAT DELIMITED
+FIELDS TERMINATED BY ','
+STORED AS INPUTFORMAT 'org.apache.hadoop.hive.ql.io.SymlinkTextInputFormat'
+OUTPUTFORMAT 'org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat'
+LOCATION 's3://ad-campaign-optimizer-2026/gold/segment_top_k/_symlink/'
+TBLPROPERTIES ('skip.header.line.count'='1');
+
+
+--SCENARIO SIMULATION (scenario_simulator.py)
+CREATE EXTERNAL TABLE ad_campaign_analytics.scenario_summary (
+    scenario_id STRING,
+    spend DECIMAL(14,2),
+    revenue DECIMAL(14,2),
+    profit DECIMAL(14,2),
+    roi_percentage DECIMAL(10,2),
+    roas DECIMAL(10,2)
+)
+ROW FORMAT DELIMITED
+FIELDS TERMINATED BY ','
+STORED AS INPUTFORMAT 'org.apache.hadoop.hive.ql.io.SymlinkTextInputFormat'
+OUTPUTFORMAT 'org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat'
+LOCATION 's3://ad-campaign-optimizer-2026/gold/scenario_summary/_symlink/'
+TBLPROPERTIES ('skip.header.line.count'='1');
+
+CREATE EXTERNAL TABLE ad_campaign_analytics.scenario_platform_results (
+    scenario_id STRING,
+    ad_platform STRING,
+    cpc DECIMAL(10,2),
+    conversion_value DECIMAL(10,2),
+    spend DECIMAL(14,2),
+    revenue DECIMAL(14,2),
+    profit DECIMAL(14,2),
+    roi_percentage DECIMAL(10,2),
+    roas DECIMAL(10,2)
+)
+ROW FORMAT DELIMITED
+FIELDS TERMINATED BY ','
+STORED AS INPUTFORMAT 'org.apache.hadoop.hive.ql.io.SymlinkTextInputFormat'
+OUTPUTFORMAT 'org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat'
+LOCATION 's3://ad-campaign-optimizer-2026/gold/scenario_platform_results/_symlink/'
+TBLPROPERTIES ('skip.header.line.count'='1');
+
+CREATE EXTERNAL TABLE ad_campaign_analytics.scenario_segment_results (
+    scenario_id STRING,
+    ad_platform STRING,
+    age_group STRING,
+    clicks BIGINT,
+    conversions INT,
+    spend DECIMAL(14,2),
+    revenue DECIMAL(14,2),
+    profit DECIMAL(14,2),
+    roi_percentage DECIMAL(10,2),
+    roas DECIMAL(10,2)
+)
+ROW FORMAT DELIMITED
+FIELDS TERMINATED BY ','
+STORED AS INPUTFORMAT 'org.apache.hadoop.hive.ql.io.SymlinkTextInputFormat'
+OUTPUTFORMAT 'org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat'
+LOCATION 's3://ad-campaign-optimizer-2026/gold/scenario_segment_results/_symlink/'
 TBLPROPERTIES ('skip.header.line.count'='1');
 
 
@@ -118,6 +330,19 @@ ORDER BY avg_roi DESC;
 -- Test 5: Executive summary
 SELECT * FROM ad_campaign_analytics.executive_summary;
 
+-- Test 6: Top 20 full segments by profit with >= 1000 impressions
+SELECT age_group, location, device_type, ad_platform, impressions, profit
+FROM ad_campaign_analytics.segment_ranking
+WHERE segment_grouping = 'age_group+location+device_type+ad_platform' AND impressions >= 1000
+ORDER BY rank_profit
+LIMIT 20;
+
+-- Test 7: Last 7 days by platform
+SELECT ad_platform, SUM(amount_spent) AS spend, SUM(profit) AS profit
+FROM ad_campaign_analytics.rolling_7d_performance
+GROUP BY ad_platform
+ORDER BY profit DESC;
+
 
 --FINAL CHECK FOR ALL TABLES
 SHOW TABLES IN ad_campaign_analytics;
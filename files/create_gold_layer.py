@@ -1,44 +1,52 @@
 import pandas as pd
-import boto3
-from io import StringIO, BytesIO
-from datetime import datetime
+from functools import partial
+
+from layer_io import BUCKET_NAME, latest_layer_key, read_layer
+from gold_publisher import (new_snapshot_version, write_snapshot,
+                            publish_snapshots, cleanup_snapshots)
+from rolling_windows import create_rolling_windows
+from segment_ranking import build_segment_index, top_segments, SEGMENT_COLUMNS
+from task_scheduler import TaskScheduler
 
 # Configuration
-BUCKET_NAME = 'ad-campaign-optimizer-2026'
+MAX_WORKERS = 8
 
-# Initialize AWS S3 client
-s3_client = boto3.client('s3')
+# Gold table -> (aggregation task, position in that task's result or None)
+GOLD_UPLOADS = {
+    'platform_performance': ('platform_performance', None),
+    'age_group_performance': ('demographics', 0),
+    'gender_performance': ('demographics', 1),
+    'location_performance': ('demographics', 2),
+    'device_performance': ('device_performance', None),
+    'day_of_week_performance': ('time_analysis', None),
+    'category_performance': ('ad_categories', 0),
+    'ad_type_performance': ('ad_categories', 1),
+    'executive_summary': ('executive_summary', None),
+    'segment_ranking': ('segment_index', 0),
+    'segment_top_k': ('segment_index', 1)
+}
 
-def get_latest_silver_file():
+def get_latest_silver_file(bucket=BUCKET_NAME):
     """
     Get the most recent file from Silver layer
     """
     print(" Finding latest file in Silver layer...")
     
-    response = s3_client.list_objects_v2(
-        Bucket=BUCKET_NAME,
-        Prefix='silver/'
-    )
-    
-    if 'Contents' not in response:
+    silver_key = latest_layer_key('silver', bucket)
+    if silver_key is None:
         print(" No files found in Silver layer!")
         return None
     
-    # Get the latest file
-    files = [obj for obj in response['Contents'] if obj['Key'].endswith('.csv')]
-    latest_file = sorted(files, key=lambda x: x['LastModified'])[-1]
-    
-    print(f" Found: {latest_file['Key']}")
-    return latest_file['Key']
+    print(f" Found: {silver_key}")
+    return silver_key
 
-def read_from_s3(s3_key):
+def read_silver_file(silver_key, bucket=BUCKET_NAME):
     """
-    Read CSV file from S3
+    Read a Silver file (Arrow IPC, or CSV from older runs)
     """
-    print(f"Reading data from S3...")
+    print(f"Reading Silver data...")
     
-    obj = s3_client.get_object(Bucket=BUCKET_NAME, Key=s3_key)
-    df = pd.read_csv(BytesIO(obj['Body'].read()))
+    df = read_layer(silver_key, bucket)
     
     print(f" Loaded {len(df)} rows with {len(df.columns)} columns")
     return df
@@ -236,10 +244,10 @@ def create_time_analysis(df):
     
     time_stats = time_stats.reset_index()
     
-    # Sort by custom day order
-    time_stats['day_order'] = time_stats['day_of_week'].apply(
-        lambda x: day_order.index(x) if x in day_order else 7
-    )
+    # Sort by custom day order (unknown days go last)
+    time_stats['day_order'] = time_stats['day_of_week'].map(
+        {day: i for i, day in enumerate(day_order)}
+    ).fillna(7)
     time_stats = time_stats.sort_values('day_order').drop('day_order', axis=1)
     
     print(f"   Created time analysis")
@@ -333,62 +341,97 @@ def create_executive_summary(df, platform_stats):
     print(f" Created executive summary with {len(summary_df)} KPIs")
     return summary_df
 
-def upload_to_s3_gold(df, filename):
+def upload_to_s3_gold(df, filename, version, bucket=BUCKET_NAME):
     """
-    Upload aggregated data to S3 Gold layer
+    Upload aggregated data to its S3 Gold snapshot (published separately)
     """
-    csv_buffer = StringIO()
-    df.to_csv(csv_buffer, index=False)
-    
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    s3_key = f"gold/{filename}_{timestamp}.csv"
-    
-    s3_client.put_object(
-        Bucket=BUCKET_NAME,
-        Key=s3_key,
-        Body=csv_buffer.getvalue()
-    )
-    
-    return s3_key
+    return write_snapshot(df, filename, version, bucket)
 
-def main():
+def upload_gold_table(result, filename, version, part=None, bucket=BUCKET_NAME):
+    """
+    Upload one table out of an aggregation task's result
+    """
+    table = result if part is None else result[part]
+    return {filename: upload_to_s3_gold(table, filename, version, bucket)}
+
+def upload_rolling_tables(rolling_tables, version, bucket=BUCKET_NAME):
+    """
+    Upload every rolling window table
+    """
+    return {name: upload_to_s3_gold(table, name, version, bucket)
+            for name, table in rolling_tables.items()}
+
+def build_gold_tasks(df, version, max_workers=MAX_WORKERS, bucket=BUCKET_NAME):
+    """
+    Declare every Gold aggregation and upload as a task with its inputs
+    """
+    scheduler = TaskScheduler(max_workers=max_workers)
+    
+    # Aggregations
+    scheduler.add('silver', lambda: df)
+    scheduler.add('platform_performance', create_platform_performance, ['silver'])
+    scheduler.add('demographics', create_demographic_insights, ['silver'])
+    scheduler.add('device_performance', create_device_performance, ['silver'])
+    scheduler.add('time_analysis', create_time_analysis, ['silver'])
+    scheduler.add('ad_categories', create_ad_category_performance, ['silver'])
+    scheduler.add('executive_summary', create_executive_summary, ['silver', 'platform_performance'])
+    scheduler.add('rolling_windows', partial(create_rolling_windows, bucket=bucket), ['silver'])
+    scheduler.add('segment_index', build_segment_index, ['silver'])
+    
+    # Uploads start as soon as their own table is ready
+    for filename, (source, part) in GOLD_UPLOADS.items():
+        scheduler.add(f"upload_{filename}",
+                      partial(upload_gold_table, filename=filename, version=version,
+                              part=part, bucket=bucket),
+                      [source])
+    scheduler.add('upload_rolling_windows',
+                  partial(upload_rolling_tables, version=version, bucket=bucket),
+                  ['rolling_windows'])
+    
+    return scheduler
+
+def run_gold(bucket=BUCKET_NAME, silver_key=None, max_workers=MAX_WORKERS):
     """
     Main Gold layer creation pipeline
+    silver_key skips the Silver listing when the caller already knows the file
+    Returns {'version', 'tables', 'rows'}, or None if there was no Silver data
     """
     print("Starting Gold Layer Creation...")
     print("=" * 70)
     
     # Step 1: Get latest Silver file
-    silver_key = get_latest_silver_file()
+    silver_key = silver_key or get_latest_silver_file(bucket)
     if not silver_key:
-        return
-    
-    # Step 2: Read from S3
-    df = read_from_s3(silver_key)
-    
-    # Step 3: Create all business aggregations
-    platform_perf = create_platform_performance(df)
-    age_stats, gender_stats, location_stats = create_demographic_insights(df)
-    device_perf = create_device_performance(df)
-    time_analysis = create_time_analysis(df)
-    category_stats, ad_type_stats = create_ad_category_performance(df)
-    exec_summary = create_executive_summary(df, platform_perf)
-    
-    # Step 4: Upload all to Gold layer
-    print("\nUploading to S3 Gold layer...")
-    
-    files_uploaded = []
-    files_uploaded.append(upload_to_s3_gold(platform_perf, 'platform_performance'))
-    files_uploaded.append(upload_to_s3_gold(age_stats, 'age_group_performance'))
-    files_uploaded.append(upload_to_s3_gold(gender_stats, 'gender_performance'))
-    files_uploaded.append(upload_to_s3_gold(location_stats, 'location_performance'))
-    files_uploaded.append(upload_to_s3_gold(device_perf, 'device_performance'))
-    files_uploaded.append(upload_to_s3_gold(time_analysis, 'day_of_week_performance'))
-    files_uploaded.append(upload_to_s3_gold(category_stats, 'category_performance'))
-    files_uploaded.append(upload_to_s3_gold(ad_type_stats, 'ad_type_performance'))
-    files_uploaded.append(upload_to_s3_gold(exec_summary, 'executive_summary'))
-    
-    print(f" Uploaded {len(files_uploaded)} files to Gold layer")
+        return None
+    
+    # Step 2: Read Silver
+    df = read_silver_file(silver_key, bucket)
+    
+    # Step 3 + 4: Create all business aggregations and upload them to Gold,
+    # running independent tables concurrently
+    version = new_snapshot_version()
+    print(f"\nBuilding and uploading Gold tables (snapshot {version})...")
+    scheduler = build_gold_tasks(df, version, max_workers, bucket)
+    results = scheduler.run()
+    
+    platform_perf = results['platform_performance']
+    age_stats, gender_stats, location_stats = results['demographics']
+    device_perf = results['device_performance']
+    time_analysis = results['time_analysis']
+    exec_summary = results['executive_summary']
+    segment_index, segment_top_k = results['segment_index']
+    
+    snapshots = {}
+    for filename in GOLD_UPLOADS:
+        snapshots.update(results[f"upload_{filename}"])
+    snapshots.update(results['upload_rolling_windows'])
+    
+    print(f"\n Uploaded {len(snapshots)} files to Gold layer")
+    scheduler.print_report()
+    
+    # Step 4b: Swap readers over to the new snapshot, then expire old ones
+    publish_snapshots(snapshots, version, bucket)
+    cleanup_snapshots(snapshots, bucket=bucket)
     
     # Step 5: Display key insights
     print("\n" + "=" * 70)
@@ -418,10 +461,22 @@ def main():
     print(f"   {best_day['day_of_week']} - ROI: {best_day['avg_roi']:.2f}% "
           f"| Conversions: {int(best_day['total_conversions'])}")
     
+    print("\n6. TOP AUDIENCE SEGMENTS BY PROFIT:")
+    top_profit = top_segments(segment_index, 'profit', k=5, top_k=segment_top_k)
+    print(top_profit[SEGMENT_COLUMNS + ['impressions', 'profit', 'roi_percentage']].to_string(index=False))
+    
     print("\n" + "=" * 70)
     print("Gold Layer Complete!")
-    print("All business-ready data stored in: s3://{}/gold/".format(BUCKET_NAME))
+    print("All business-ready data stored in: s3://{}/gold/".format(bucket))
     print("=" * 70)
+    
+    return {'version': version, 'tables': len(snapshots), 'rows': len(df)}
+
+def main():
+    """
+    Run the Gold layer creation for the default bucket
+    """
+    run_gold()
 
 if __name__ == "__main__":
     main()
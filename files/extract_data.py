@@ -1,21 +1,34 @@
+import numpy as np
 import pandas as pd
-import boto3
-from io import StringIO
 from datetime import datetime
 
+from layer_io import BUCKET_NAME, STORAGE_BACKEND, write_layer
+
 # Configuration
-BUCKET_NAME = 'ad-campaign-optimizer-2026'
 CSV_FILE = 'social_media_ad_optimization.csv'
 
-# Initialize AWS S3 client
-s3_client = boto3.client('s3')
+# Industry average Cost Per Click (CPC) by platform
+CPC_RATES = {
+    'Facebook': 1.72,    # $1.72 per click
+    'Instagram': 1.20,   # $1.20 per click  
+    'Twitter': 0.38,     # $0.38 per click
+    'LinkedIn': 5.26     # $5.26 per click (most expensive)
+}
+DEFAULT_CPC = 1.50
+
+# Assumed value of one conversion
+CONVERSION_VALUE = 50.0
 
-def load_local_data():
+# Low-cardinality columns stored dictionary-encoded in Bronze; the transformation
+# reads them back as categoricals and segments by their codes without rehashing
+CATEGORICAL_COLUMNS = ['ad_platform', 'device_type', 'event_date', 'ingestion_batch_id']
+
+def load_local_data(csv_file=CSV_FILE):
     """
     Load the CSV file from your computer
     """
     print("Loading data from local file...")
-    df = pd.read_csv(CSV_FILE)
+    df = pd.read_csv(csv_file)
     print(f"Loaded {len(df)} rows and {len(df.columns)} columns")
     return df
 
@@ -26,73 +39,99 @@ def add_cost_data(df):
     """
     print("\nAdding cost data based on industry benchmarks...")
     
-    # Industry average Cost Per Click (CPC) by platform
-    cpc_rates = {
-        'Facebook': 1.72,    # $1.72 per click
-        'Instagram': 1.20,   # $1.20 per click  
-        'Twitter': 0.38,     # $0.38 per click
-        'LinkedIn': 5.26     # $5.26 per click (most expensive)
-    }
-    
     # Calculate amount spent for each campaign
-    df['amount_spent'] = df.apply(
-        lambda row: row['clicks'] * cpc_rates.get(row['ad_platform'], 1.50),
-        axis=1
-    )
+    cpc = df['ad_platform'].map(CPC_RATES).fillna(DEFAULT_CPC)
+    df['amount_spent'] = df['clicks'] * cpc
     
     # Round to 2 decimal places
     df['amount_spent'] = df['amount_spent'].round(2)
     
     # Calculate conversion value (assume each conversion is worth $50)
-    df['conversion_value'] = df['conversion'] * 50.0
+    df['conversion_value'] = df['conversion'] * CONVERSION_VALUE
     
     print(f" Added cost columns (amount_spent, conversion_value)")
     return df
 
-def upload_to_s3_bronze(df, filename):
+def add_event_time(df, batch_time=None):
     """
-    Upload DataFrame to S3 Bronze layer (raw data)
+    Add event-time columns so downstream layers can build daily windows
+    The source only has day_of_week, so each row is dated to the most recent
+    matching weekday on or before the batch date (the batch covers the last 7 days)
     """
-    print(f"\n Uploading to S3 Bronze layer...")
+    print("\nAdding event-time columns...")
     
-    # Convert DataFrame to CSV format
-    csv_buffer = StringIO()
-    df.to_csv(csv_buffer, index=False)
+    batch_time = batch_time or datetime.now()
+    batch_date = batch_time.date()
     
-    # Create filename with timestamp
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    s3_key = f"bronze/{filename}_{timestamp}.csv"
+    if 'event_date' not in df.columns:
+        day_numbers = {
+            'Monday': 0, 'Tuesday': 1, 'Wednesday': 2, 'Thursday': 3,
+            'Friday': 4, 'Saturday': 5, 'Sunday': 6
+        }
+        weekday = df['day_of_week'].str.title().map(day_numbers)
+        days_back = (batch_date.weekday() - weekday) % 7
+        
+        # Rows with an unknown day_of_week are dated to the batch date
+        days_back = days_back.fillna(0).astype(int)
+        
+        # days_back is already the code of each row's date among the last 7 days
+        dates = [(pd.Timestamp(batch_date) - pd.Timedelta(days=n)).strftime('%Y-%m-%d') for n in range(7)]
+        df['event_date'] = pd.Categorical.from_codes(days_back.to_numpy(), dates)
+    
+    # Every row of one extraction run shares the same batch id
+    df['ingestion_batch_id'] = pd.Categorical.from_codes(
+        np.zeros(len(df), dtype=np.int8), [batch_time.strftime('%Y%m%d_%H%M%S')]
+    )
+    
+    print(f" Added event_date ({min(df['event_date'].unique())} to {max(df['event_date'].unique())}) "
+          f"and ingestion_batch_id")
+    return df
+
+def encode_categories(df):
+    """
+    Store the low-cardinality columns as categoricals (dictionary-encoded in Bronze)
+    """
+    columns = [col for col in CATEGORICAL_COLUMNS if col in df.columns]
+    return df.astype({col: 'category' for col in columns})
+
+def write_bronze(df, filename, bucket=BUCKET_NAME):
+    """
+    Write DataFrame to the Bronze layer (raw data) as Arrow IPC
+    """
+    print(f"\n Writing to {STORAGE_BACKEND} Bronze layer...")
     
     try:
-        # Upload to S3
-        s3_client.put_object(
-            Bucket=BUCKET_NAME,
-            Key=s3_key,
-            Body=csv_buffer.getvalue()
-        )
+        bronze_key = write_layer(df, 'bronze', filename, bucket)
         
-        print(f"Uploaded to: s3://{BUCKET_NAME}/{s3_key}")
-        return s3_key
+        print(f"Written to: {bronze_key}")
+        return bronze_key
     
     except Exception as e:
-        print(f"Error uploading to S3: {str(e)}")
+        print(f"Error writing Bronze file: {str(e)}")
         print(f"   Make sure AWS credentials are configured correctly")
         return None
 
-def main():
+def run_extraction(csv_file=CSV_FILE, bucket=BUCKET_NAME):
     """
     Main extraction pipeline
+    Returns {'bronze_key', 'rows'}, bronze_key is None if the write failed
     """
     print(" Starting Data Extraction Pipeline...")
     print("=" * 70)
     
     # Step 1: Load data
-    df = load_local_data()
+    df = load_local_data(csv_file)
     
     # Step 2: Add cost data
     df = add_cost_data(df)
     
-    # Step 3: Show basic info
+    # Step 3: Add event date and ingestion batch id
+    df = add_event_time(df)
+    
+    # Step 4: Encode low-cardinality columns once, at ingest
+    df = encode_categories(df)
+    
+    # Step 5: Show basic info
     print(f"\n Dataset Summary:")
     print(f"   - Total ad campaigns: {len(df)}")
     print(f"   - Platforms: {df['ad_platform'].unique().tolist()}")
@@ -104,15 +143,15 @@ def main():
     
     # Platform breakdown
     print(f"\n Platform Breakdown:")
-    platform_summary = df.groupby('ad_platform').agg({
+    platform_summary = df.groupby('ad_platform', observed=True).agg({
         'amount_spent': 'sum',
         'clicks': 'sum',
         'conversion': 'sum'
     }).round(2)
     print(platform_summary)
     
-    # Step 4: Upload to S3 Bronze
-    s3_path = upload_to_s3_bronze(df, 'raw_campaigns')
+    # Step 6: Write to Bronze
+    s3_path = write_bronze(df, 'raw_campaigns', bucket)
     
     if s3_path:
         print("\n" + "=" * 70)
@@ -120,8 +159,16 @@ def main():
         print(f" Data stored in Bronze layer: {s3_path}")
     else:
         print("\n" + "=" * 70)
-        print("Extraction completed but S3 upload failed.")
+        print("Extraction completed but the Bronze write failed.")
         print("Check your AWS credentials with: aws sts get-caller-identity")
+    
+    return {'bronze_key': s3_path, 'rows': len(df)}
+
+def main():
+    """
+    Run the extraction for the default bucket and input file
+    """
+    run_extraction()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,185 @@
+import json
+import time
+import uuid
+import random
+from io import StringIO
+from datetime import datetime, timezone
+from botocore.exceptions import ClientError
+
+from layer_io import BUCKET_NAME, s3_client
+
+# Configuration
+MANIFEST_KEY = 'gold/_manifest/current.json'
+
+# Snapshot versions kept per table (the published one is always kept)
+RETAIN_SNAPSHOTS = 5
+
+# transform, gold and the simulator all publish into the one manifest; a
+# conditional PUT that lost the race is retried on the fresh manifest
+MANIFEST_RETRIES = 10
+MANIFEST_RETRY_DELAY = 0.2
+
+def new_snapshot_version():
+    """
+    Sortable, unique version id for one Gold run
+    """
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+def snapshot_key(table, version):
+    """
+    gold/<table>/snapshots/<version>/<table>.csv
+    """
+    return f"gold/{table}/snapshots/{version}/{table}.csv"
+
+def symlink_key(table):
+    """
+    Pointer file Athena reads (SymlinkTextInputFormat table location)
+    """
+    return f"gold/{table}/_symlink/symlink.txt"
+
+def write_snapshot(df, table, version, bucket=BUCKET_NAME):
+    """
+    Write one table into its versioned snapshot prefix
+    Nothing reads it until the snapshot is published
+    """
+    csv_buffer = StringIO()
+    df.to_csv(csv_buffer, index=False)
+
+    s3_key = snapshot_key(table, version)
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=s3_key,
+        Body=csv_buffer.getvalue()
+    )
+    return s3_key
+
+def read_manifest(bucket=BUCKET_NAME):
+    """
+    Manifest and its ETag (None before the first publish)
+    """
+    try:
+        obj = s3_client.get_object(Bucket=bucket, Key=MANIFEST_KEY)
+    except s3_client.exceptions.NoSuchKey:
+        return {'tables': {}}, None
+    return json.loads(obj['Body'].read()), obj['ETag']
+
+def load_manifest(bucket=BUCKET_NAME):
+    """
+    Currently published Gold snapshot per table ({} before the first publish)
+    """
+    return read_manifest(bucket)[0]
+
+def publish_snapshots(snapshots, version, bucket=BUCKET_NAME):
+    """
+    Make a set of already-written snapshots visible
+
+    snapshots: {table: snapshot key}
+    The manifest is swapped first in one conditional PUT and is the consistent
+    cross-table view for manifest readers; every table entry carries its own
+    version. Tables that already hold a newer version are left alone, so a
+    slow or retrying run never rolls back a newer one. Only the tables this
+    run won then get their symlink.txt replaced, each with a single PUT, so
+    Athena never sees a half-written or duplicated table.
+    """
+    print(f"\nPublishing Gold snapshot {version} ({len(snapshots)} tables)...")
+
+    published_at = datetime.now(timezone.utc).isoformat()
+    for attempt in range(1, MANIFEST_RETRIES + 1):
+        manifest, etag = read_manifest(bucket)
+
+        # Versions sort by time, so a greater version is a newer publish
+        won = {table: key for table, key in snapshots.items()
+               if manifest['tables'].get(table, {}).get('version', '') <= version}
+        for table in snapshots.keys() - won.keys():
+            print(f" {table}: newer version {manifest['tables'][table]['version']} "
+                  f"already published, skipping")
+        if not won:
+            break
+
+        for table, key in won.items():
+            manifest['tables'][table] = {
+                'version': version,
+                'key': key,
+                'published_at': published_at
+            }
+        # Writers publish different tables, so there is no single manifest version
+        manifest.pop('version', None)
+        manifest['updated_at'] = published_at
+
+        # Only replace the manifest we read; another writer's publish in
+        # between makes S3 reject the PUT instead of losing its tables
+        condition = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+        try:
+            s3_client.put_object(
+                Bucket=bucket,
+                Key=MANIFEST_KEY,
+                Body=json.dumps(manifest, indent=2),
+                ContentType='application/json',
+                **condition
+            )
+            break
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ('PreconditionFailed', 'ConditionalRequestConflict'):
+                raise
+            print(f" Manifest changed while publishing, retrying ({attempt}/{MANIFEST_RETRIES})")
+            time.sleep(MANIFEST_RETRY_DELAY * attempt * random.uniform(0.5, 1.5))
+    else:
+        raise RuntimeError(f"Manifest kept changing, gave up after {MANIFEST_RETRIES} attempts")
+
+    # Symlinks follow the manifest, and only for the tables this run won
+    for table, key in won.items():
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=symlink_key(table),
+            Body=f"s3://{bucket}/{key}\n"
+        )
+
+    # A newer run may have won a table between our manifest PUT and the symlink
+    # PUT; point those symlinks back at whatever the manifest now publishes
+    current = load_manifest(bucket)['tables']
+    for table in won:
+        entry = current.get(table, {})
+        if entry.get('version', version) > version:
+            s3_client.put_object(
+                Bucket=bucket,
+                Key=symlink_key(table),
+                Body=f"s3://{bucket}/{entry['key']}\n"
+            )
+
+    print(f" Published {len(won)} of {len(snapshots)} tables")
+    return manifest
+
+def cleanup_snapshots(tables, retain=RETAIN_SNAPSHOTS, bucket=BUCKET_NAME):
+    """
+    Delete all but the newest `retain` snapshot versions of each table,
+    never touching the published one
+    """
+    print(f"\nCleaning up Gold snapshots (keeping {retain} per table)...")
+
+    published = {table: entry['version'] for table, entry in load_manifest(bucket)['tables'].items()}
+    paginator = s3_client.get_paginator('list_objects_v2')
+    deleted = 0
+
+    for table in tables:
+        prefix = f"gold/{table}/snapshots/"
+        keys_by_version = {}
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                version = obj['Key'][len(prefix):].split('/', 1)[0]
+                keys_by_version.setdefault(version, []).append(obj['Key'])
+
+        expired = sorted(keys_by_version, reverse=True)[retain:]
+        stale_keys = [key for version in expired if version != published.get(table)
+                      for key in keys_by_version[version]]
+
+        # delete_objects takes at most 1000 keys per request
+        for i in range(0, len(stale_keys), 1000):
+            s3_client.delete_objects(
+                Bucket=bucket,
+                Delete={'Objects': [{'Key': key} for key in stale_keys[i:i + 1000]],
+                        'Quiet': True}
+            )
+        deleted += len(stale_keys)
+
+    print(f" Deleted {deleted} expired snapshot files")
+    return deleted
@@ -0,0 +1,195 @@
+import os
+import sys
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import boto3
+from botocore.config import Config
+from io import BytesIO
+from datetime import datetime
+
+# Configuration
+BUCKET_NAME = 'ad-campaign-optimizer-2026'
+
+# 's3' (default) or 'local'; the local backend keeps Bronze/Silver on disk
+# under LOCAL_ROOT/<bucket>/
+STORAGE_BACKEND = os.environ.get('PIPELINE_STORAGE', 's3')
+LOCAL_ROOT = os.environ.get('PIPELINE_LOCAL_ROOT', 'data_lake')
+
+# Bronze/Silver are stored as Arrow IPC files (Feather v2)
+LAYER_EXTENSION = '.arrow'
+
+# Exports live outside the layer folders so they are never read back as layer files
+EXPORT_PREFIX = 'exports'
+
+# Compress on S3 to save transfer; local files stay uncompressed so
+# memory-mapped reads hand out the file's column buffers without copying
+S3_COMPRESSION = 'zstd'
+
+# One S3 client (and connection pool) shared by every module and worker thread
+S3_MAX_CONNECTIONS = 50
+s3_client = boto3.client('s3', config=Config(max_pool_connections=S3_MAX_CONNECTIONS))
+
+def local_path(key, bucket=BUCKET_NAME):
+    """
+    Local backend path of a key
+    """
+    return os.path.join(LOCAL_ROOT, bucket, key)
+
+def to_arrow(df):
+    """
+    DataFrame -> Arrow table
+    Categorical columns are stored dictionary-encoded; readers get plain
+    strings back unless they ask for the dictionaries (see read_layer)
+    """
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+def decode_dictionaries(table):
+    """
+    Replace dictionary-encoded columns with their plain values
+    """
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+    return table
+
+def serialize(table, compression=None):
+    """
+    Arrow table -> Arrow IPC file bytes
+    """
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+def write_layer(df, layer, filename, bucket=BUCKET_NAME):
+    """
+    Write a DataFrame to a layer as <layer>/<filename>_<timestamp>.arrow
+    Returns the key (relative path on the local backend)
+    """
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    key = f"{layer}/{filename}_{timestamp}{LAYER_EXTENSION}"
+    table = to_arrow(df)
+
+    if STORAGE_BACKEND == 'local':
+        path = local_path(key, bucket)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with pa.OSFile(path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    else:
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=serialize(table, S3_COMPRESSION).to_pybytes()
+        )
+
+    return key
+
+def latest_layer_key(layer, bucket=BUCKET_NAME):
+    """
+    Most recent file in a layer (Arrow, or CSV from older runs), or None
+    """
+    extensions = (LAYER_EXTENSION, '.csv')
+
+    if STORAGE_BACKEND == 'local':
+        folder = local_path(layer, bucket)
+        if not os.path.isdir(folder):
+            return None
+        files = [name for name in os.listdir(folder) if name.endswith(extensions)]
+        if not files:
+            return None
+        latest = max(files, key=lambda name: os.path.getmtime(os.path.join(folder, name)))
+        return f"{layer}/{latest}"
+
+    paginator = s3_client.get_paginator('list_objects_v2')
+    files = []
+    for page in paginator.paginate(Bucket=bucket, Prefix=f"{layer}/"):
+        files.extend(obj for obj in page.get('Contents', []) if obj['Key'].endswith(extensions))
+    if not files:
+        return None
+    return max(files, key=lambda x: x['LastModified'])['Key']
+
+def read_layer_table(key, bucket=BUCKET_NAME, keep_dictionaries=False):
+    """
+    Read a layer file as an Arrow table
+    On the local backend the file is memory-mapped: columns point straight
+    into the page cache instead of being parsed or copied
+    Dictionary-encoded columns are decoded unless keep_dictionaries is set
+    """
+    if key.endswith('.csv'):
+        if STORAGE_BACKEND == 'local':
+            return pa_csv.read_csv(local_path(key, bucket))
+        obj = s3_client.get_object(Bucket=bucket, Key=key)
+        return pa_csv.read_csv(pa.BufferReader(obj['Body'].read()))
+
+    if STORAGE_BACKEND == 'local':
+        source = pa.memory_map(local_path(key, bucket), 'r')
+    else:
+        obj = s3_client.get_object(Bucket=bucket, Key=key)
+        source = pa.BufferReader(obj['Body'].read())
+    table = pa.ipc.open_file(source).read_all()
+    return table if keep_dictionaries else decode_dictionaries(table)
+
+def read_layer(key, bucket=BUCKET_NAME, categorical=False):
+    """
+    Read a layer file as a DataFrame
+    categorical=True returns dictionary-encoded columns as pandas categoricals,
+    so their codes can be used without hashing the values again
+    """
+    if key.endswith('.csv'):
+        # Older CSV runs: keep pandas' own parsing so dtypes match what they were
+        if STORAGE_BACKEND == 'local':
+            return pd.read_csv(local_path(key, bucket))
+        obj = s3_client.get_object(Bucket=bucket, Key=key)
+        return pd.read_csv(BytesIO(obj['Body'].read()))
+
+    # split_blocks avoids consolidating columns into 2D blocks, which lets
+    # null-free numeric columns stay views over the Arrow buffers
+    return read_layer_table(key, bucket, categorical).to_pandas(split_blocks=True)
+
+def export_layer(key, fmt='parquet', bucket=BUCKET_NAME):
+    """
+    Convert a layer file to CSV or Parquet for external consumers
+    Written to exports/<layer>/<file>.<fmt>; returns the new key
+    """
+    if fmt not in ('csv', 'parquet'):
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    table = read_layer_table(key, bucket)
+    export_key = f"{EXPORT_PREFIX}/{os.path.splitext(key)[0]}.{fmt}"
+
+    sink = pa.BufferOutputStream()
+    if fmt == 'parquet':
+        pq.write_table(table, sink, compression='snappy')
+    else:
+        pa_csv.write_csv(table, sink)
+
+    if STORAGE_BACKEND == 'local':
+        path = local_path(export_key, bucket)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(sink.getvalue().to_pybytes())
+    else:
+        s3_client.put_object(Bucket=bucket, Key=export_key, Body=sink.getvalue().to_pybytes())
+
+    return export_key
+
+def main():
+    """
+    Export the latest Bronze and Silver files: python layer_io.py [parquet|csv]
+    """
+    fmt = sys.argv[1] if len(sys.argv) > 1 else 'parquet'
+
+    print(f"Exporting latest Bronze/Silver files as {fmt} ({STORAGE_BACKEND} backend)...")
+    for layer in ('bronze', 'silver'):
+        key = latest_layer_key(layer)
+        if key is None or not key.endswith(LAYER_EXTENSION):
+            print(f" No Arrow file found in {layer}/")
+            continue
+        print(f" {key} -> {export_layer(key, fmt)}")
+
+if __name__ == "__main__":
+    main()
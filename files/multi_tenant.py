@@ -0,0 +1,269 @@
+import sys
+import time
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+import pandas as pd
+
+from extract_data import CSV_FILE, run_extraction
+from transform_data import run_transformation
+from create_gold_layer import run_gold
+
+# Configuration
+TENANTS_FILE = 'tenants.csv'
+MAX_WORKERS = 8
+
+# Gold task threads per tenant; the tenant pool is where the parallelism comes from
+GOLD_WORKERS = 2
+
+STAGES = ['extract', 'transform', 'gold']
+
+# Tenant whose stage the current thread (or Gold task) is running
+current_tenant = contextvars.ContextVar('current_tenant', default=None)
+
+class TenantOutput:
+    """
+    stdout while tenants run: each line a stage prints is prefixed with its
+    tenant id and written whole, so concurrent tenants never mix inside a line
+
+    Unfinished lines are held per (tenant, thread): pool threads move between
+    tenants, so a thread-local buffer would carry text into the next tenant
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.pending = {}
+
+    def write(self, text):
+        tenant_id = current_tenant.get()
+        if tenant_id is None:
+            with self.lock:
+                self.stream.write(text)
+            return len(text)
+
+        # Hold back the unfinished end of a line until its newline arrives
+        key = (tenant_id, threading.get_ident())
+        with self.lock:
+            *lines, rest = (self.pending.pop(key, '') + text).split('\n')
+            if rest:
+                self.pending[key] = rest
+            if lines:
+                self.stream.write(''.join(f"[{tenant_id}] {line}\n" for line in lines))
+        return len(text)
+
+    def flush_tenant(self, tenant_id):
+        """
+        Write out whatever a tenant left without a trailing newline
+        """
+        with self.lock:
+            for key in [key for key in self.pending if key[0] == tenant_id]:
+                self.stream.write(f"[{tenant_id}] {self.pending.pop(key)}\n")
+
+    def flush(self):
+        self.stream.flush()
+
+class TenantRun:
+    """
+    Progress, outputs and timings of one tenant's pipeline
+    """
+
+    def __init__(self, tenant_id, bucket, input_csv):
+        self.tenant_id = tenant_id
+        self.bucket = bucket
+        self.input_csv = input_csv
+        self.next_stage = 0
+        self.status = 'pending'
+        self.error = None
+        self.rows = 0
+        self.bronze_key = None
+        self.silver_key = None
+        self.queued_at = None
+        self.queue_wait = 0.0
+        self.stage_seconds = {}
+        self.started_at = None
+        self.finished_at = None
+
+def load_tenants(path=TENANTS_FILE):
+    """
+    Read the tenant list: tenant_id, bucket, optional input_csv
+    Every tenant needs its own bucket so their layers never mix
+    """
+    print(f"Loading tenants from {path}...")
+
+    tenants = pd.read_json(path) if path.endswith('.json') else pd.read_csv(path)
+    missing = {'tenant_id', 'bucket'} - set(tenants.columns)
+    if missing:
+        raise ValueError(f"Tenant file is missing columns: {sorted(missing)}")
+
+    if 'input_csv' not in tenants.columns:
+        tenants['input_csv'] = CSV_FILE
+    tenants['input_csv'] = tenants['input_csv'].fillna(CSV_FILE)
+
+    duplicated = tenants['bucket'][tenants['bucket'].duplicated()].unique().tolist()
+    if duplicated:
+        raise ValueError(f"Buckets shared by several tenants: {duplicated}")
+
+    runs = [TenantRun(row.tenant_id, row.bucket, row.input_csv)
+            for row in tenants.itertuples(index=False)]
+
+    print(f" Loaded {len(runs)} tenants")
+    return runs
+
+def run_stage(run, stage):
+    """
+    Run one pipeline stage for one tenant, handing keys to the next stage
+    so only the first stage has to look anything up
+    """
+    start = time.perf_counter()
+    run.queue_wait += start - run.queued_at
+    if run.started_at is None:
+        run.started_at = start
+
+    token = current_tenant.set(run.tenant_id)
+    try:
+        if stage == 'extract':
+            result = run_extraction(run.input_csv, run.bucket)
+            if not result['bronze_key']:
+                raise RuntimeError('Bronze write failed')
+            run.bronze_key = result['bronze_key']
+            run.rows = result['rows']
+
+        elif stage == 'transform':
+            result = run_transformation(run.bucket, run.bronze_key)
+            if result is None:
+                raise RuntimeError('No Bronze data')
+            run.silver_key = result['silver_key']
+
+        elif stage == 'gold':
+            result = run_gold(run.bucket, run.silver_key, max_workers=GOLD_WORKERS)
+            if result is None:
+                raise RuntimeError('No Silver data')
+    finally:
+        if isinstance(sys.stdout, TenantOutput):
+            sys.stdout.flush_tenant(run.tenant_id)
+        current_tenant.reset(token)
+        run.stage_seconds[stage] = time.perf_counter() - start
+
+def run_tenants(runs, max_workers=MAX_WORKERS):
+    """
+    Run every tenant's extract -> transform -> gold on one shared pool
+
+    Each tenant has at most one stage in flight. A tenant that finishes a
+    stage goes to the back of the queue, so tenants advance round-robin and
+    a large tenant cannot hold back the others. A failing stage stops only
+    that tenant. Stage output is prefixed with the tenant id.
+    """
+    ready = deque(runs)
+    now = time.perf_counter()
+    for run in runs:
+        run.queued_at = now
+
+    stdout = sys.stdout
+    sys.stdout = TenantOutput(stdout)
+    try:
+        schedule_tenants(ready, max_workers)
+    finally:
+        sys.stdout = stdout
+
+    return runs
+
+def schedule_tenants(ready, max_workers):
+    """
+    Round-robin loop behind run_tenants
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        running = {}
+
+        while ready or running:
+            while ready and len(running) < max_workers:
+                run = ready.popleft()
+                run.status = 'running'
+                stage = STAGES[run.next_stage]
+                running[pool.submit(run_stage, run, stage)] = run
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                run = running.pop(future)
+                stage = STAGES[run.next_stage]
+                try:
+                    future.result()
+                except Exception as e:
+                    run.status = 'failed'
+                    run.error = f"{stage}: {e}"
+                    run.finished_at = time.perf_counter()
+                    print(f"\n Tenant {run.tenant_id} failed in {stage}: {e}")
+                    continue
+
+                run.next_stage += 1
+                if run.next_stage == len(STAGES):
+                    run.status = 'succeeded'
+                    run.finished_at = time.perf_counter()
+                else:
+                    run.queued_at = time.perf_counter()
+                    ready.append(run)
+
+def tenant_report(runs):
+    """
+    Per-tenant status, stage latencies and throughput
+    """
+    rows = []
+    for run in runs:
+        busy = sum(run.stage_seconds.values())
+        latency = (run.finished_at - run.started_at) if run.started_at and run.finished_at else None
+        rows.append({
+            'tenant_id': run.tenant_id,
+            'bucket': run.bucket,
+            'status': run.status,
+            'error': run.error,
+            'rows': run.rows,
+            **{f"{stage}_seconds": run.stage_seconds.get(stage) for stage in STAGES},
+            'queue_wait_seconds': run.queue_wait,
+            'latency_seconds': latency,
+            'rows_per_second': run.rows / busy if busy else None
+        })
+    return pd.DataFrame(rows).round(3)
+
+def main():
+    """
+    Multi-tenant pipeline: python multi_tenant.py [tenants.csv] [max_workers]
+    """
+    print("Starting Multi-Tenant Pipeline...")
+    print("=" * 70)
+
+    tenants_file = sys.argv[1] if len(sys.argv) > 1 else TENANTS_FILE
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else MAX_WORKERS
+
+    runs = load_tenants(tenants_file)
+
+    start = time.perf_counter()
+    run_tenants(runs, max_workers)
+    elapsed = time.perf_counter() - start
+
+    report = tenant_report(runs)
+    report_file = f"tenant_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    report.to_csv(report_file, index=False)
+
+    succeeded = (report['status'] == 'succeeded').sum()
+
+    print("\n" + "=" * 70)
+    print("TENANT REPORT")
+    print("=" * 70)
+    print(report.drop(columns=['bucket', 'error']).to_string(index=False))
+
+    failed = report[report['status'] == 'failed']
+    if len(failed):
+        print("\nFailures:")
+        print(failed[['tenant_id', 'error']].to_string(index=False))
+
+    print("\n" + "=" * 70)
+    print(f"Multi-Tenant Pipeline Complete! {succeeded}/{len(report)} tenants succeeded "
+          f"in {elapsed:.1f}s with {max_workers} workers")
+    print(f" Report saved to: {report_file}")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    main()
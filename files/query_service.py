@@ -0,0 +1,280 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import duckdb
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from gold_publisher import load_manifest
+from layer_io import BUCKET_NAME, latest_layer_key, read_layer_table, s3_client
+
+# Configuration
+LOCAL_DATA_DIR = 'local_lake'
+HOST = '127.0.0.1'
+PORT = 8815
+CACHE_SIZE = 256
+CACHE_MAX_BYTES = 256 * 1024 * 1024      # total size of cached result bodies
+CACHE_MAX_ENTRY_BYTES = 16 * 1024 * 1024 # larger results are served but not cached
+
+
+def find_latest_files():
+    """
+    Find the latest Silver file and the published snapshot of every Gold table
+    Returns {view_name: {'Key', 'ETag'}}
+    """
+    latest = {}
+
+    # Silver is found through layer_io, so the local backend is honoured;
+    # layer keys carry their write timestamp, so the key doubles as the version
+    silver_key = latest_layer_key('silver')
+    if silver_key:
+        latest['silver_campaigns'] = {'Key': silver_key, 'ETag': silver_key}
+
+    # Gold comes from the publish manifest, so all tables belong to published snapshots
+    for table, entry in load_manifest()['tables'].items():
+        latest[table] = {'Key': entry['key'], 'ETag': entry['version']}
+
+    return latest
+
+def compute_data_version(latest):
+    """
+    Data version = hash of the (view, key, ETag) set currently being served
+    """
+    digest = hashlib.sha1()
+    for view in sorted(latest):
+        digest.update(f"{view}|{latest[view]['Key']}|{latest[view]['ETag']}\n".encode())
+    return digest.hexdigest()[:16]
+
+class QueryService:
+    """
+    Embedded DuckDB over the latest Silver file and local copies of the Gold
+    tables, with a result cache keyed by (data version, query, format)
+    """
+
+    def __init__(self, data_dir=LOCAL_DATA_DIR, cache_size=CACHE_SIZE,
+                 cache_max_bytes=CACHE_MAX_BYTES):
+        self.data_dir = data_dir
+        self.cache_size = cache_size
+        self.cache_max_bytes = cache_max_bytes
+        self.conn = duckdb.connect(database=':memory:')
+
+        # Queries come over HTTP: no file or network access, and no SET to undo it.
+        # Layer files are read in Python and registered, so loading does not need it.
+        self.conn.execute('SET enable_external_access = false')
+        self.conn.execute('SET lock_configuration = true')
+
+        self.data_version = None
+        self.views = {}
+        self.cache = OrderedDict()
+        self.cache_bytes = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(self.data_dir, exist_ok=True)
+
+    def refresh(self):
+        """
+        Load changed files and (re)register them in DuckDB
+        Silver is read through layer_io (memory-mapped on the local backend);
+        Gold snapshots are downloaded to data_dir
+        Cheap when nothing changed: one listing plus the manifest
+        """
+        latest = find_latest_files()
+        version = compute_data_version(latest)
+
+        if version == self.data_version:
+            print(f" Data unchanged (version {version})")
+            return version
+
+        print(f" Loading data version {version}...")
+        with self.lock:
+            for view, obj in latest.items():
+                if self.views.get(view) == obj['ETag']:
+                    continue
+
+                if obj['Key'].startswith('silver/'):
+                    table = read_layer_table(obj['Key'])
+                else:
+                    local_path = os.path.join(self.data_dir, f"{view}.csv")
+                    s3_client.download_file(BUCKET_NAME, obj['Key'], local_path)
+                    table = pa_csv.read_csv(local_path)
+
+                # Materialize into DuckDB's columnar storage so queries never re-parse files
+                self.conn.register('_arrow_load', table)
+                self.conn.execute(f'CREATE OR REPLACE TABLE "{view}" AS SELECT * FROM _arrow_load')
+                self.conn.unregister('_arrow_load')
+                self.views[view] = obj['ETag']
+                print(f"   {view} <- {obj['Key']}")
+
+            self.data_version = version
+            self.cache.clear()
+            self.cache_bytes = 0
+
+        print(f" Serving {len(self.views)} tables")
+        return version
+
+    def query(self, sql, fmt='json'):
+        """
+        Run a read-only query, returning (body bytes, content type, cache hit)
+        """
+        sql = sql.strip().rstrip(';')
+        statements = duckdb.extract_statements(sql)
+        if len(statements) != 1:
+            raise ValueError('Send exactly one statement per query')
+        if statements[0].type != duckdb.StatementType.SELECT:
+            raise ValueError('Only SELECT queries are allowed')
+        if fmt not in ('json', 'arrow'):
+            raise ValueError(f"Unknown format: {fmt}")
+
+        # Key on the exact text: rewriting whitespace could change string literals
+        cache_key = (self.data_version, fmt, sql)
+        with self.lock:
+            if cache_key in self.cache:
+                self.cache.move_to_end(cache_key)
+                self.cache_hits += 1
+                body, content_type = self.cache[cache_key]
+                return body, content_type, True
+            self.cache_misses += 1
+
+        # Each request thread gets its own cursor on the shared database
+        cursor = self.conn.cursor()
+        try:
+            result = cursor.execute(sql)
+            if fmt == 'arrow':
+                table = result.fetch_arrow_table()
+                sink = pa.BufferOutputStream()
+                with pa.ipc.new_stream(sink, table.schema) as writer:
+                    writer.write_table(table)
+                body = sink.getvalue().to_pybytes()
+                content_type = 'application/vnd.apache.arrow.stream'
+            else:
+                columns = [col[0] for col in result.description]
+                rows = result.fetchall()
+                body = json.dumps({
+                    'data_version': cache_key[0],
+                    'columns': columns,
+                    'rows': rows
+                }, default=str).encode()
+                content_type = 'application/json'
+        finally:
+            cursor.close()
+
+        with self.lock:
+            # Only cache if the data did not change while the query was running,
+            # and evict by total body size so a few large results cannot hold the memory
+            size = len(body)
+            if (cache_key[0] == self.data_version and cache_key not in self.cache
+                    and size <= CACHE_MAX_ENTRY_BYTES):
+                self.cache[cache_key] = (body, content_type)
+                self.cache_bytes += size
+                while self.cache and (len(self.cache) > self.cache_size
+                                      or self.cache_bytes > self.cache_max_bytes):
+                    evicted_body, _ = self.cache.popitem(last=False)[1]
+                    self.cache_bytes -= len(evicted_body)
+
+        return body, content_type, False
+
+    def status(self):
+        """
+        Current data version, tables and cache statistics
+        """
+        return {
+            'data_version': self.data_version,
+            'tables': sorted(self.views),
+            'cache_entries': len(self.cache),
+            'cache_bytes': self.cache_bytes,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses
+        }
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET  /status   -> data version, tables, cache stats
+    POST /query    -> {"sql": "...", "format": "json" | "arrow"}
+    POST /refresh  -> reload changed Silver/Gold files
+    """
+
+    def send_body(self, status, body, content_type='application/json', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, payload):
+        self.send_body(status, json.dumps(payload, default=str).encode())
+
+    def do_GET(self):
+        if self.path == '/status':
+            self.send_json(200, self.server.service.status())
+        else:
+            self.send_json(404, {'error': f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        service = self.server.service
+
+        if self.path == '/refresh':
+            try:
+                version = service.refresh()
+                self.send_json(200, {'data_version': version})
+            except Exception as e:
+                self.send_json(500, {'error': str(e)})
+            return
+
+        if self.path != '/query':
+            self.send_json(404, {'error': f"Unknown path: {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            body, content_type, cache_hit = service.query(
+                request.get('sql', ''), request.get('format', 'json')
+            )
+        except (ValueError, duckdb.Error) as e:
+            self.send_json(400, {'error': str(e)})
+            return
+
+        self.send_body(200, body, content_type, {
+            'X-Data-Version': str(service.data_version),
+            'X-Cache': 'HIT' if cache_hit else 'MISS'
+        })
+
+    def log_message(self, format, *args):
+        # Keep the console quiet; dashboard refreshes fire many requests
+        pass
+
+def main():
+    """
+    Start the local query service
+    """
+    print("Starting Local Query Service...")
+    print("=" * 70)
+
+    service = QueryService()
+    service.refresh()
+
+    server = ThreadingHTTPServer((HOST, PORT), QueryRequestHandler)
+    server.service = service
+
+    print("\n" + "=" * 70)
+    print(f"Query service listening on http://{HOST}:{PORT}")
+    print("   POST /query   {\"sql\": \"SELECT * FROM platform_performance\"}")
+    print("   POST /refresh reload changed layer files")
+    print("   GET  /status  data version and cache stats")
+    print("=" * 70)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down query service")
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
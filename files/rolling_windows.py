@@ -0,0 +1,248 @@
+import numpy as np
+import pandas as pd
+from io import BytesIO
+from datetime import date
+
+from layer_io import BUCKET_NAME, s3_client
+
+# Configuration
+STATE_KEY = 'gold/_state/rolling_windows.npz'
+
+# Rolling windows (in days) maintained from the same day bins
+WINDOW_SIZES = [7, 28]
+RING_DAYS = max(WINDOW_SIZES)
+
+# One rolling series per platform x segment
+SEGMENT_COLUMNS = ['ad_platform', 'age_group']
+
+# Additive metrics kept per day bin (ratios are derived from the sums)
+METRICS = ['campaigns', 'impressions', 'clicks', 'conversion',
+           'amount_spent', 'conversion_value', 'profit']
+
+# Metrics that are counts; written as integers so Athena can read them as INT/BIGINT
+COUNT_METRICS = ['campaigns', 'impressions', 'clicks', 'conversion']
+
+# How many applied batch ids to remember (protects against double counting)
+MAX_BATCH_HISTORY = 500
+
+class RollingWindowState:
+    """
+    Array-backed day bins for rolling window aggregates
+
+    bins[slot, segment, metric] holds one day's sums, with slot = day % RING_DAYS.
+    window_sums[w] is kept up to date as days enter and leave each window,
+    so a new day costs O(segments) instead of a rescan of the history.
+    """
+
+    def __init__(self):
+        self.segments = []
+        self.segment_index = {}
+        self.bins = np.zeros((RING_DAYS, 0, len(METRICS)))
+        self.bin_days = np.full(RING_DAYS, -1, dtype=np.int64)
+        self.window_sums = {w: np.zeros((0, len(METRICS))) for w in WINDOW_SIZES}
+        self.last_day = -1
+        self.applied_batches = []
+
+    def segment_ids(self, keys):
+        """
+        Map segment keys to array rows, growing the arrays for new segments
+        """
+        new_keys = [key for key in dict.fromkeys(keys) if key not in self.segment_index]
+        if new_keys:
+            for key in new_keys:
+                self.segment_index[key] = len(self.segments)
+                self.segments.append(key)
+            pad = len(new_keys)
+            self.bins = np.pad(self.bins, ((0, 0), (0, pad), (0, 0)))
+            for w in WINDOW_SIZES:
+                self.window_sums[w] = np.pad(self.window_sums[w], ((0, pad), (0, 0)))
+        return np.array([self.segment_index[key] for key in keys], dtype=np.int64)
+
+    def advance_to(self, day):
+        """
+        Move the window end forward to `day`, evicting days that fall out
+        """
+        if self.last_day < 0 or day - self.last_day >= RING_DAYS:
+            # Nothing in the ring survives a gap this long
+            self.bins[:] = 0
+            self.bin_days[:] = -1
+            for w in WINDOW_SIZES:
+                self.window_sums[w][:] = 0
+            self.last_day = day
+            return
+
+        for end in range(self.last_day + 1, day + 1):
+            for w in WINDOW_SIZES:
+                leaving = end - w
+                slot = leaving % RING_DAYS
+                if self.bin_days[slot] == leaving:
+                    self.window_sums[w] -= self.bins[slot]
+
+            slot = end % RING_DAYS
+            self.bins[slot] = 0
+            self.bin_days[slot] = end
+
+        self.last_day = day
+
+    def set_day(self, day, segment_ids, values):
+        """
+        Replace one day's per-segment sums (values: segments x metrics)
+        Every extraction re-covers the last days in full, so a later batch for
+        the same event date replaces that day's bin instead of adding to it
+        """
+        if day > self.last_day:
+            self.advance_to(day)
+        elif day <= self.last_day - RING_DAYS:
+            print(f"   Skipping {date.fromordinal(day)}: older than {RING_DAYS} days")
+            return
+
+        slot = day % RING_DAYS
+        if self.bin_days[slot] == day:
+            # Take the previous sums for this day out of the windows holding it
+            for w in WINDOW_SIZES:
+                if day > self.last_day - w:
+                    self.window_sums[w] -= self.bins[slot]
+        self.bins[slot] = 0
+        self.bin_days[slot] = day
+
+        np.add.at(self.bins[slot], segment_ids, values)
+        for w in WINDOW_SIZES:
+            if day > self.last_day - w:
+                np.add.at(self.window_sums[w], segment_ids, values)
+
+    def add_batch(self, df):
+        """
+        Fold a Silver batch into the day bins, one event date at a time
+        Each event date in the batch replaces what earlier batches had for it
+        Returns False if the batch was already applied
+        """
+        batch_ids = df['ingestion_batch_id'].astype(str).unique().tolist()
+        if all(batch_id in self.applied_batches for batch_id in batch_ids):
+            return False
+
+        df = df[~df['ingestion_batch_id'].astype(str).isin(self.applied_batches)]
+
+        values = pd.DataFrame({
+            'campaigns': 1.0,
+            'impressions': df['impressions'],
+            'clicks': df['clicks'],
+            'conversion': df['conversion'],
+            'amount_spent': df['amount_spent'],
+            'conversion_value': df['conversion_value'],
+            'profit': df['profit']
+        }, index=df.index)
+
+        codes, keys = pd.MultiIndex.from_frame(df[SEGMENT_COLUMNS].astype(str)).factorize()
+        values['segment'] = self.segment_ids(list(keys))[codes]
+        values['day'] = pd.to_datetime(df['event_date']).map(pd.Timestamp.toordinal)
+
+        # Collapse to one row per (day, segment) before touching the bins
+        daily = values.groupby(['day', 'segment'], sort=True)[METRICS].sum().reset_index()
+        for day, day_rows in daily.groupby('day', sort=True):
+            self.set_day(int(day), day_rows['segment'].to_numpy(),
+                         day_rows[METRICS].to_numpy(dtype=np.float64))
+
+        self.applied_batches = (self.applied_batches + batch_ids)[-MAX_BATCH_HISTORY:]
+        return True
+
+    def window_table(self, w):
+        """
+        Rolling window aggregates for every segment with activity in the window
+        """
+        sums = pd.DataFrame(self.window_sums[w], columns=METRICS)
+        keys = pd.DataFrame(self.segments, columns=SEGMENT_COLUMNS)
+        table = pd.concat([keys, sums], axis=1)
+        table = table[table['campaigns'] > 0].copy()
+
+        table[COUNT_METRICS] = table[COUNT_METRICS].round().astype(np.int64)
+        table['window_days'] = w
+        table['window_end'] = date.fromordinal(self.last_day).isoformat() if self.last_day > 0 else None
+
+        # Ratios are recomputed from window sums, never averaged across days
+        table['ctr'] = table['clicks'] / table['impressions'].replace(0, 1) * 100
+        table['conversion_rate'] = table['conversion'] / table['clicks'].replace(0, 1) * 100
+        table['cost_per_click'] = table['amount_spent'] / table['clicks'].replace(0, 1)
+        table['roas'] = table['conversion_value'] / table['amount_spent'].replace(0, 1)
+        table['roi_percentage'] = (
+            (table['conversion_value'] - table['amount_spent']) / table['amount_spent'].replace(0, 1) * 100
+        )
+
+        columns = ['window_end', 'window_days'] + SEGMENT_COLUMNS + METRICS + [
+            'ctr', 'conversion_rate', 'cost_per_click', 'roas', 'roi_percentage'
+        ]
+        return table[columns].round(2).reset_index(drop=True)
+
+    def to_bytes(self):
+        """
+        Serialize the state as an .npz archive
+        """
+        buffer = BytesIO()
+        np.savez_compressed(
+            buffer,
+            segments=np.array(self.segments, dtype=str).reshape(-1, len(SEGMENT_COLUMNS)),
+            bins=self.bins,
+            bin_days=self.bin_days,
+            last_day=np.array(self.last_day),
+            applied_batches=np.array(self.applied_batches, dtype=str),
+            **{f"window_{w}": self.window_sums[w] for w in WINDOW_SIZES}
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Rebuild the state from an .npz archive
+        """
+        archive = np.load(BytesIO(data), allow_pickle=False)
+        state = cls()
+        state.segments = [tuple(row) for row in archive['segments'].tolist()]
+        state.segment_index = {key: i for i, key in enumerate(state.segments)}
+        state.bins = archive['bins']
+        state.bin_days = archive['bin_days']
+        state.last_day = int(archive['last_day'])
+        state.applied_batches = archive['applied_batches'].tolist()
+        state.window_sums = {w: archive[f"window_{w}"] for w in WINDOW_SIZES}
+        return state
+
+def load_state(bucket=BUCKET_NAME):
+    """
+    Load rolling window state from S3 (empty state on first run)
+    """
+    try:
+        obj = s3_client.get_object(Bucket=bucket, Key=STATE_KEY)
+    except s3_client.exceptions.NoSuchKey:
+        print(" No rolling window state found, starting fresh")
+        return RollingWindowState()
+    return RollingWindowState.from_bytes(obj['Body'].read())
+
+def save_state(state, bucket=BUCKET_NAME):
+    """
+    Persist rolling window state to S3
+    """
+    s3_client.put_object(Bucket=bucket, Key=STATE_KEY, Body=state.to_bytes())
+
+def create_rolling_windows(df, bucket=BUCKET_NAME):
+    """
+    Update the rolling window state with a Silver batch
+    Returns {table_name: DataFrame} for every window size
+    """
+    print("\nUpdating rolling window tables...")
+
+    if 'event_date' not in df.columns or 'ingestion_batch_id' not in df.columns:
+        print(" Silver data has no event_date/ingestion_batch_id, skipping rolling windows")
+        return {}
+
+    state = load_state(bucket)
+    if state.add_batch(df):
+        save_state(state, bucket)
+    else:
+        print(" Batch already applied, reusing current windows")
+
+    tables = {f"rolling_{w}d_performance": state.window_table(w) for w in WINDOW_SIZES}
+
+    if state.last_day < 1:
+        print(" No event dates seen yet, rolling windows are empty")
+    else:
+        print(f" Rolling windows up to {date.fromordinal(state.last_day)} "
+              f"for {len(state.segments)} segments")
+    return tables
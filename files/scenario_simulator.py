@@ -0,0 +1,215 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from extract_data import CPC_RATES, DEFAULT_CPC, CONVERSION_VALUE
+from create_gold_layer import get_latest_silver_file, read_silver_file, upload_to_s3_gold
+from gold_publisher import new_snapshot_version, publish_snapshots, cleanup_snapshots
+
+# Configuration
+SCENARIO_FILE = 'scenarios.csv'
+
+# Results are reported per platform x segment
+SEGMENT_COLUMNS = ['ad_platform', 'age_group']
+
+# Silver title-cases ad_platform ('LinkedIn' -> 'Linkedin'), so baseline rates
+# and scenario columns are matched on the title-cased name
+BASELINE_CPC = {platform.title(): rate for platform, rate in CPC_RATES.items()}
+
+# Default grid when no scenario file is given: CPC multipliers x conversion values
+DEFAULT_CPC_MULTIPLIERS = np.round(np.arange(0.5, 2.01, 0.05), 2)
+DEFAULT_CONVERSION_VALUES = [30.0, 40.0, 50.0, 60.0, 75.0]
+
+def aggregate_volumes(df):
+    """
+    Pre-aggregate clicks and conversions per platform x segment
+    These are the only inputs the scenarios change the price of
+    """
+    print("\nAggregating clicks and conversions per segment...")
+
+    volumes = df.groupby(SEGMENT_COLUMNS, observed=True).agg({
+        'user_id': 'count',
+        'clicks': 'sum',
+        'conversion': 'sum'
+    }).reset_index()
+    volumes.columns = SEGMENT_COLUMNS + ['campaigns', 'clicks', 'conversions']
+
+    print(f" {len(volumes)} segments")
+    return volumes
+
+def generate_scenario_grid(platforms, cpc_multipliers=DEFAULT_CPC_MULTIPLIERS,
+                           conversion_values=DEFAULT_CONVERSION_VALUES):
+    """
+    Scenario matrix: every CPC multiplier (applied to all baseline rates)
+    combined with every conversion value
+    """
+    rows = []
+    for multiplier in cpc_multipliers:
+        for value in conversion_values:
+            row = {'scenario_id': f"cpc_x{multiplier:.2f}_value_{value:g}"}
+            for platform in platforms:
+                row[platform] = round(BASELINE_CPC.get(platform.title(), DEFAULT_CPC) * multiplier, 4)
+            row['conversion_value'] = value
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+def load_scenarios(path):
+    """
+    Read a scenario matrix: scenario_id, one CPC column per platform, conversion_value
+    Platform columns match case-insensitively ('LinkedIn' or 'Linkedin').
+    Missing platform columns fall back to the baseline CPC, a missing
+    conversion_value column to the baseline conversion value
+    """
+    print(f"\nLoading scenarios from {path}...")
+    scenarios = pd.read_csv(path)
+    if 'scenario_id' not in scenarios.columns:
+        scenarios.insert(0, 'scenario_id', [f"scenario_{i + 1}" for i in range(len(scenarios))])
+    print(f" Loaded {len(scenarios)} scenarios")
+    return scenarios
+
+def simulate_scenarios(volumes, scenarios):
+    """
+    Evaluate every scenario against every segment in one broadcast
+
+    cpc[k, s]   = CPC of segment s's platform under scenario k
+    spend[k, s] = cpc[k, s] * clicks[s]
+    revenue     = conversion_value[k] * conversions[s]
+
+    Returns (segment_results, platform_results) in long format
+    """
+    platforms = volumes['ad_platform'].astype(str)
+    platform_names = sorted(platforms.unique())
+    platform_idx = platforms.map({p: i for i, p in enumerate(platform_names)}).to_numpy()
+
+    # K x P matrix of CPC rates, baseline where the scenario does not say
+    scenario_columns = {str(col).title(): col for col in scenarios.columns
+                        if col not in ('scenario_id', 'conversion_value')}
+    cpc_matrix = np.column_stack([
+        scenarios[scenario_columns[p.title()]].to_numpy(dtype=np.float64) if p.title() in scenario_columns
+        else np.full(len(scenarios), BASELINE_CPC.get(p.title(), DEFAULT_CPC))
+        for p in platform_names
+    ])
+    if 'conversion_value' in scenarios.columns:
+        values = scenarios['conversion_value'].to_numpy(dtype=np.float64)
+    else:
+        values = np.full(len(scenarios), CONVERSION_VALUE)
+
+    clicks = volumes['clicks'].to_numpy(dtype=np.float64)
+    conversions = volumes['conversions'].to_numpy(dtype=np.float64)
+
+    spend = cpc_matrix[:, platform_idx] * clicks           # K x S
+    revenue = values[:, None] * conversions                 # K x S
+
+    # Platform totals: sum segments with a one-hot S x P matrix
+    one_hot = np.zeros((len(volumes), len(platform_names)))
+    one_hot[np.arange(len(volumes)), platform_idx] = 1.0
+    platform_spend = spend @ one_hot                        # K x P
+    platform_revenue = revenue @ one_hot                    # K x P
+
+    def metrics(spend, revenue):
+        profit = revenue - spend
+        with np.errstate(divide='ignore', invalid='ignore'):
+            roi = np.where(spend > 0, profit / spend * 100, np.nan)
+            roas = np.where(spend > 0, revenue / spend, np.nan)
+        return {
+            'spend': spend.ravel(),
+            'revenue': revenue.ravel(),
+            'profit': profit.ravel(),
+            'roi_percentage': roi.ravel(),
+            'roas': roas.ravel()
+        }
+
+    n_scenarios = len(scenarios)
+    scenario_ids = scenarios['scenario_id'].to_numpy()
+
+    segment_results = pd.DataFrame({
+        'scenario_id': np.repeat(scenario_ids, len(volumes)),
+        **{col: np.tile(volumes[col].astype(str).to_numpy(), n_scenarios) for col in SEGMENT_COLUMNS},
+        'clicks': np.tile(volumes['clicks'].to_numpy(dtype=np.int64), n_scenarios),
+        'conversions': np.tile(volumes['conversions'].to_numpy(dtype=np.int64), n_scenarios),
+        **metrics(spend, revenue)
+    })
+
+    platform_results = pd.DataFrame({
+        'scenario_id': np.repeat(scenario_ids, len(platform_names)),
+        'ad_platform': np.tile(platform_names, n_scenarios),
+        'cpc': cpc_matrix.ravel(),
+        'conversion_value': np.repeat(values, len(platform_names)),
+        **metrics(platform_spend, platform_revenue)
+    })
+
+    return segment_results.round(2), platform_results.round(2)
+
+def summarize_scenarios(platform_results):
+    """
+    One row per scenario with totals across platforms, best profit first
+    """
+    totals = platform_results.groupby('scenario_id', sort=False).agg({
+        'spend': 'sum',
+        'revenue': 'sum',
+        'profit': 'sum'
+    })
+    totals['roi_percentage'] = (totals['profit'] / totals['spend'].replace(0, np.nan) * 100).round(2)
+    totals['roas'] = (totals['revenue'] / totals['spend'].replace(0, np.nan)).round(2)
+    return totals.sort_values('profit', ascending=False).reset_index()
+
+def main():
+    """
+    Main scenario simulation pipeline
+    """
+    print("Starting CPC Scenario Simulation...")
+    print("=" * 70)
+
+    # Step 1: Get latest Silver file
+    silver_key = get_latest_silver_file()
+    if not silver_key:
+        return
+
+    # Step 2: Read and pre-aggregate volumes
+    df = read_silver_file(silver_key)
+    volumes = aggregate_volumes(df)
+
+    # Step 3: Load or generate scenarios
+    scenario_file = sys.argv[1] if len(sys.argv) > 1 else SCENARIO_FILE
+    if os.path.exists(scenario_file):
+        scenarios = load_scenarios(scenario_file)
+    else:
+        print(f"\nNo {scenario_file} found, using default CPC x conversion value grid")
+        scenarios = generate_scenario_grid(sorted(volumes['ad_platform'].astype(str).unique()))
+        print(f" Generated {len(scenarios)} scenarios")
+
+    # Step 4: Simulate all scenarios at once
+    print("\nSimulating scenarios...")
+    start = time.perf_counter()
+    segment_results, platform_results = simulate_scenarios(volumes, scenarios)
+    elapsed = time.perf_counter() - start
+    print(f" Simulated {len(scenarios)} scenarios x {len(volumes)} segments "
+          f"in {elapsed * 1000:.1f} ms")
+
+    summary = summarize_scenarios(platform_results)
+
+    # Step 5: Upload results to Gold layer
+    print("\nUploading to S3 Gold layer...")
+    version = new_snapshot_version()
+    snapshots = {
+        'scenario_summary': upload_to_s3_gold(summary, 'scenario_summary', version),
+        'scenario_platform_results': upload_to_s3_gold(platform_results, 'scenario_platform_results', version),
+        'scenario_segment_results': upload_to_s3_gold(segment_results, 'scenario_segment_results', version)
+    }
+    print(f" Uploaded {len(snapshots)} scenario tables to Gold layer")
+    publish_snapshots(snapshots, version)
+    cleanup_snapshots(snapshots)
+
+    print("\n" + "=" * 70)
+    print("TOP 5 SCENARIOS BY PROFIT")
+    print("=" * 70)
+    print(summary.head(5).to_string(index=False))
+
+    print("\n" + "=" * 70)
+    print("Scenario Simulation Complete!")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import sys
+import heapq
+import pandas as pd
+from io import BytesIO
+from itertools import combinations
+
+from gold_publisher import load_manifest
+from layer_io import BUCKET_NAME, s3_client
+
+# Audience dimensions; every non-empty combination of them is ranked
+SEGMENT_COLUMNS = ['age_group', 'location', 'device_type', 'ad_platform']
+FULL_GROUPING = '+'.join(SEGMENT_COLUMNS)
+
+# Metrics with a precomputed ranking (higher is better)
+RANK_METRICS = ['profit', 'roi_percentage', 'roas', 'conversion_rate', 'conversions']
+
+# Top-K heaps kept per (grouping, metric, minimum impressions)
+HEAP_SIZE = 100
+VOLUME_TIERS = [0, 100, 1000, 10000]
+
+def aggregate_combinations(df):
+    """
+    Sums for every combination of the segment dimensions
+    Silver is scanned once at the finest level; coarser combinations are
+    rolled up from those sums. Dimensions not in a combination are 'ALL'.
+    """
+    finest = df.groupby(SEGMENT_COLUMNS, observed=True).agg(
+        campaigns=('user_id', 'count'),
+        impressions=('impressions', 'sum'),
+        clicks=('clicks', 'sum'),
+        conversions=('conversion', 'sum'),
+        spend=('amount_spent', 'sum'),
+        revenue=('conversion_value', 'sum')
+    ).reset_index()
+    sums = ['campaigns', 'impressions', 'clicks', 'conversions', 'spend', 'revenue']
+
+    frames = []
+    for size in range(1, len(SEGMENT_COLUMNS) + 1):
+        for dims in combinations(SEGMENT_COLUMNS, size):
+            agg = finest.groupby(list(dims), observed=True)[sums].sum().reset_index()
+            agg.insert(0, 'segment_grouping', '+'.join(dims))
+            for col in SEGMENT_COLUMNS:
+                if col not in dims:
+                    agg[col] = 'ALL'
+            frames.append(agg)
+
+    combos = pd.concat(frames, ignore_index=True)
+    combos[SEGMENT_COLUMNS] = combos[SEGMENT_COLUMNS].astype(str)
+
+    # Ratios from the combination's totals, not averages of row ratios
+    combos['profit'] = combos['revenue'] - combos['spend']
+    combos['ctr'] = combos['clicks'] / combos['impressions'].replace(0, 1) * 100
+    combos['conversion_rate'] = combos['conversions'] / combos['clicks'].replace(0, 1) * 100
+    combos['roi_percentage'] = combos['profit'] / combos['spend'].replace(0, 1) * 100
+    combos['roas'] = combos['revenue'] / combos['spend'].replace(0, 1)
+
+    columns = ['segment_grouping'] + SEGMENT_COLUMNS + sums + [
+        'profit', 'ctr', 'conversion_rate', 'roi_percentage', 'roas'
+    ]
+    return combos[columns].round(2)
+
+def build_segment_index(df):
+    """
+    Build the segment ranking index and the top-K heaps
+    Returns (segment_ranking, segment_top_k)
+    """
+    print("\nBuilding segment ranking index...")
+
+    index = aggregate_combinations(df)
+
+    # Rank 1 = best within the same grouping
+    for metric in RANK_METRICS:
+        index[f"rank_{metric}"] = index.groupby('segment_grouping')[metric].rank(
+            ascending=False, method='first'
+        ).astype(int)
+    index = index.sort_values(['segment_grouping', f"rank_{RANK_METRICS[0]}"]).reset_index(drop=True)
+
+    top_k_frames = []
+    impressions = index['impressions'].to_numpy()
+    for grouping, rows in index.groupby('segment_grouping', sort=False).indices.items():
+        for metric in RANK_METRICS:
+            values = index[metric].to_numpy()
+            for tier in VOLUME_TIERS:
+                eligible = [i for i in rows if impressions[i] >= tier]
+                best = heapq.nlargest(HEAP_SIZE, eligible, key=values.__getitem__)
+                if not best:
+                    continue
+                heap = index.iloc[best].copy()
+                heap.insert(0, 'heap_rank', range(1, len(best) + 1))
+                heap.insert(0, 'min_impressions', tier)
+                heap.insert(0, 'metric', metric)
+                top_k_frames.append(heap)
+
+    top_k = pd.concat(top_k_frames, ignore_index=True) if top_k_frames else pd.DataFrame()
+
+    print(f" Ranked {len(index)} segment combinations across "
+          f"{index['segment_grouping'].nunique()} groupings")
+    return index, top_k
+
+def top_segments(index, metric, k=20, min_impressions=0, grouping=FULL_GROUPING, top_k=None):
+    """
+    Top-k segments of a grouping by metric, with at least min_impressions
+    Answered from the top-K heaps when they are enough, otherwise by walking
+    the precomputed rank order; Silver is never touched.
+    """
+    if metric not in RANK_METRICS:
+        raise ValueError(f"No ranking for {metric}; choose from {RANK_METRICS}")
+
+    if top_k is not None and len(top_k) and k <= HEAP_SIZE:
+        tier = max(t for t in VOLUME_TIERS if t <= min_impressions)
+        heap = top_k[(top_k['metric'] == metric) &
+                     (top_k['segment_grouping'] == grouping) &
+                     (top_k['min_impressions'] == tier)]
+        matches = heap[heap['impressions'] >= min_impressions]
+
+        # A heap that is not full already holds every eligible segment
+        if len(matches) >= k or len(heap) < HEAP_SIZE:
+            return matches.sort_values('heap_rank').head(k).drop(
+                columns=['metric', 'min_impressions', 'heap_rank']
+            ).reset_index(drop=True)
+
+    candidates = index[(index['segment_grouping'] == grouping) & (index['impressions'] >= min_impressions)]
+    return candidates.nsmallest(k, f"rank_{metric}").reset_index(drop=True)
+
+def load_published_table(table, bucket=BUCKET_NAME):
+    """
+    Read a published Gold table through the manifest
+    """
+    entry = load_manifest(bucket)['tables'].get(table)
+    if entry is None:
+        return None
+    obj = s3_client.get_object(Bucket=bucket, Key=entry['key'])
+    return pd.read_csv(BytesIO(obj['Body'].read()), dtype={col: str for col in SEGMENT_COLUMNS})
+
+def main():
+    """
+    Query the published ranking: python segment_ranking.py [metric] [k] [min_impressions]
+    """
+    metric = sys.argv[1] if len(sys.argv) > 1 else 'profit'
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    min_impressions = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+
+    print("Loading segment ranking index...")
+    index = load_published_table('segment_ranking')
+    if index is None:
+        print(" No segment_ranking table published yet, run create_gold_layer.py first")
+        return
+    top_k = load_published_table('segment_top_k')
+
+    print(f"\nTop {k} segments by {metric} with >= {min_impressions:,} impressions:")
+    result = top_segments(index, metric, k, min_impressions, top_k=top_k)
+    print(result[SEGMENT_COLUMNS + ['impressions', 'spend', 'profit', 'roi_percentage']].to_string(index=False))
+
+if __name__ == "__main__":
+    main()
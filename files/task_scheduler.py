@@ -0,0 +1,151 @@
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+class Task:
+    """
+    One unit of work: func is called with the results of its inputs, in order
+    """
+
+    def __init__(self, name, func, inputs=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+
+class TaskScheduler:
+    """
+    Small dependency-aware scheduler
+
+    Tasks start as soon as all of their inputs are done, so independent
+    tasks run concurrently on a thread pool and a dependent task waits only
+    for what it needs. Records start/end times for critical-path reporting.
+    """
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self.tasks = {}
+        self.results = {}
+        self.timings = {}
+
+    def add(self, name, func, inputs=()):
+        """
+        Register a task; inputs are names of tasks whose results it receives
+        """
+        if name in self.tasks:
+            raise ValueError(f"Task already registered: {name}")
+        self.tasks[name] = Task(name, func, inputs)
+
+    def topological_order(self):
+        """
+        Tasks ordered so that every task comes after its inputs
+        """
+        order = []
+        state = {}
+
+        def visit(name, path):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+            if name not in self.tasks:
+                raise ValueError(f"Unknown input '{name}' required by {path[-1]}")
+            state[name] = 'visiting'
+            for dep in self.tasks[name].inputs:
+                visit(dep, path + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in self.tasks:
+            visit(name, [])
+        return order
+
+    def run_task(self, task):
+        """
+        Call one task with its input results and record its timing
+        """
+        start = time.perf_counter()
+        try:
+            return task.func(*[self.results[dep] for dep in task.inputs])
+        finally:
+            self.timings[task.name] = (start, time.perf_counter())
+
+    def run(self):
+        """
+        Run every task, returning {task name: result}
+        The first failure stops new tasks from starting and is re-raised
+        """
+        order = self.topological_order()
+        remaining = {name: set(self.tasks[name].inputs) for name in order}
+        self.started_at = time.perf_counter()
+        failure = None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = {}
+
+            while remaining or running:
+                if failure is None:
+                    ready = [name for name in order if name in remaining and not remaining[name]]
+                    for name in ready:
+                        del remaining[name]
+                        # Tasks see the caller's context variables (e.g. the tenant being run)
+                        context = contextvars.copy_context()
+                        running[pool.submit(context.run, self.run_task, self.tasks[name])] = name
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        self.results[name] = future.result()
+                    except Exception as e:
+                        if failure is None:
+                            failure = RuntimeError(f"Task '{name}' failed: {e}")
+                            failure.__cause__ = e
+                        continue
+                    for deps in remaining.values():
+                        deps.discard(name)
+
+        self.finished_at = time.perf_counter()
+        if failure is not None:
+            raise failure
+        return self.results
+
+    def critical_path(self):
+        """
+        Longest chain of dependent task durations: this bounds the run time
+        no matter how many workers are available
+        Returns (task names, seconds)
+        """
+        cost = {}
+        previous = {}
+        for name in self.topological_order():
+            start, end = self.timings[name]
+            best = max(self.tasks[name].inputs, key=lambda dep: cost[dep], default=None)
+            cost[name] = (end - start) + (cost[best] if best else 0.0)
+            previous[name] = best
+
+        name = max(cost, key=cost.get)
+        total = cost[name]
+        path = []
+        while name:
+            path.append(name)
+            name = previous[name]
+        return path[::-1], total
+
+    def print_report(self):
+        """
+        Per-task timings plus the critical path
+        """
+        wall = self.finished_at - self.started_at
+        busy = sum(end - start for start, end in self.timings.values())
+        path, path_seconds = self.critical_path()
+
+        print(f"\n Task timings ({len(self.timings)} tasks, {self.max_workers} workers):")
+        for name, (start, end) in sorted(self.timings.items(), key=lambda item: item[1][0]):
+            marker = '*' if name in path else ' '
+            print(f"   {marker} {name:<35} start {start - self.started_at:7.2f}s  "
+                  f"took {end - start:7.2f}s")
+        print(f"\n Wall time: {wall:.2f}s (sequential would be ~{busy:.2f}s)")
+        print(f" Critical path ({path_seconds:.2f}s): {' -> '.join(path)}")
@@ -1,48 +1,47 @@
+import time
 import pandas as pd
-import boto3
-from io import StringIO, BytesIO
-from datetime import datetime
 
-# Configuration
-BUCKET_NAME = 'ad-campaign-optimizer-2026'
+from anomaly_detection import detect_anomalies, anomaly_history, save_state
+from gold_publisher import new_snapshot_version, write_snapshot, publish_snapshots, cleanup_snapshots
+from layer_io import BUCKET_NAME, STORAGE_BACKEND, latest_layer_key, read_layer, write_layer
 
-# Initialize AWS S3 client
-s3_client = boto3.client('s3')
-
-def get_latest_bronze_file():
+def get_latest_bronze_file(bucket=BUCKET_NAME):
     """
     Get the most recent file from Bronze layer
     """
     print("Finding latest file in Bronze layer...")
     
-    response = s3_client.list_objects_v2(
-        Bucket=BUCKET_NAME,
-        Prefix='bronze/'
-    )
-    
-    if 'Contents' not in response:
+    bronze_key = latest_layer_key('bronze', bucket)
+    if bronze_key is None:
         print("No files found in Bronze layer!")
         return None
     
-    # Get the latest file
-    files = [obj for obj in response['Contents'] if obj['Key'].endswith('.csv')]
-    latest_file = sorted(files, key=lambda x: x['LastModified'])[-1]
-    
-    print(f"Found: {latest_file['Key']}")
-    return latest_file['Key']
+    print(f"Found: {bronze_key}")
+    return bronze_key
 
-def read_from_s3(s3_key):
+def read_bronze_file(bronze_key, bucket=BUCKET_NAME):
     """
-    Read CSV file from S3
+    Read a Bronze file (Arrow IPC, or CSV from older runs)
     """
-    print(f" Reading data from S3...")
+    print(f" Reading data from {STORAGE_BACKEND} Bronze layer...")
     
-    obj = s3_client.get_object(Bucket=BUCKET_NAME, Key=s3_key)
-    df = pd.read_csv(BytesIO(obj['Body'].read()))
+    # Dictionary-encoded Bronze columns come back as categoricals
+    df = read_layer(bronze_key, bucket, categorical=True)
     
     print(f" Loaded {len(df)} rows")
     return df
 
+def title_case(values):
+    """
+    Title-case a text column; categoricals only rename their categories
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        titled = values.cat.categories.str.title()
+        if titled.is_unique:
+            return values.cat.rename_categories(titled)
+        values = values.astype(object)
+    return values.str.title()
+
 def clean_data(df):
     """
     Clean and validate data
@@ -64,7 +63,7 @@ def clean_data(df):
     # 3. Standardize text fields
     df['gender'] = df['gender'].str.upper()
     df['location'] = df['location'].str.title()
-    df['ad_platform'] = df['ad_platform'].str.title()
+    df['ad_platform'] = title_case(df['ad_platform'])
     
     removed_rows = initial_rows - len(df)
     print(f" Removed {removed_rows} invalid records")
@@ -150,41 +149,34 @@ def add_business_categories(df):
     
     return df
 
-def upload_to_s3_silver(df, filename):
+def write_silver(df, filename, bucket=BUCKET_NAME):
     """
-    Upload cleaned data to S3 Silver layer
+    Write cleaned data to the Silver layer as Arrow IPC
     """
-    print(f"\n Uploading to S3 Silver layer...")
-    
-    csv_buffer = StringIO()
-    df.to_csv(csv_buffer, index=False)
+    print(f"\n Writing to {STORAGE_BACKEND} Silver layer...")
     
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    s3_key = f"silver/{filename}_{timestamp}.csv"
-    
-    s3_client.put_object(
-        Bucket=BUCKET_NAME,
-        Key=s3_key,
-        Body=csv_buffer.getvalue()
-    )
+    silver_key = write_layer(df, 'silver', filename, bucket)
     
-    print(f"Uploaded to: s3://{BUCKET_NAME}/{s3_key}")
-    return s3_key
+    print(f"Written to: {silver_key}")
+    return silver_key
 
-def main():
+def run_transformation(bucket=BUCKET_NAME, bronze_key=None):
     """
     Main transformation pipeline
+    bronze_key skips the Bronze listing when the caller already knows the file
+    Returns {'silver_key', 'rows'}, or None if there was no Bronze data
     """
     print("Starting Data Transformation Pipeline...")
     print("=" * 70)
+    start = time.perf_counter()
     
     # Step 1: Get latest Bronze file
-    bronze_key = get_latest_bronze_file()
+    bronze_key = bronze_key or get_latest_bronze_file(bucket)
     if not bronze_key:
-        return
+        return None
     
-    # Step 2: Read from S3
-    df = read_from_s3(bronze_key)
+    # Step 2: Read Bronze
+    df = read_bronze_file(bronze_key, bucket)
     
     # Step 3: Clean data
     df_clean = clean_data(df)
@@ -192,10 +184,15 @@ def main():
     # Step 4: Calculate metrics
     df_clean = calculate_metrics(df_clean)
     
-    # Step 5: Add business categories
+    # Step 5: Score the batch against streaming per-segment statistics
+    anomaly_start = time.perf_counter()
+    anomalies, anomaly_state = detect_anomalies(df_clean, bucket)
+    anomaly_seconds = time.perf_counter() - anomaly_start
+    
+    # Step 6: Add business categories
     df_clean = add_business_categories(df_clean)
     
-    # Step 6: Show summary
+    # Step 7: Show summary
     print(f"\nTransformation Summary:")
     print(f"   - Total records: {len(df_clean)}")
     print(f"   - Total columns: {len(df_clean.columns)} (added {len(df_clean.columns) - len(df)})")
@@ -204,15 +201,43 @@ def main():
     print(f"   - Average Conversion Rate: {df_clean['conversion_rate'].mean():.2f}%")
     
     print(f"\nTop Performing Platform:")
-    platform_roi = df_clean.groupby('ad_platform')['roi_percentage'].mean().sort_values(ascending=False)
+    platform_roi = df_clean.groupby('ad_platform', observed=True)['roi_percentage'].mean().sort_values(ascending=False)
     print(platform_roi)
     
-    # Step 7: Upload to Silver layer
-    silver_key = upload_to_s3_silver(df_clean, 'clean_campaigns')
-    
+    # Step 8: Upload to Silver layer
+    silver_key = write_silver(df_clean, 'clean_campaigns', bucket)
+    
+    # Step 9: Append anomalies to their Gold table; the statistics are only saved
+    # once it is published, so a failed run can simply be rerun
+    if anomalies is not None:
+        publish_start = time.perf_counter()
+        version = new_snapshot_version()
+        history = anomaly_history(anomalies, bucket)
+        snapshots = {'anomalies': write_snapshot(history, 'anomalies', version, bucket)}
+        publish_snapshots(snapshots, version, bucket)
+        cleanup_snapshots(snapshots, bucket=bucket)
+        save_state(anomaly_state, bucket)
+        anomaly_seconds += time.perf_counter() - publish_start
+    
+    if anomalies is not None and len(anomalies):
+        print(f"\nAnomalies ({len(anomalies)}):")
+        print(anomalies[['event_date', 'ad_platform', 'device_type', 'metric',
+                         'value', 'expected', 'direction', 'severity']].to_string(index=False))
+    
+    elapsed = time.perf_counter() - start
     print("\n" + "=" * 70)
     print("Transformation Complete!")
     print(f" Clean data stored in Silver layer: {silver_key}")
+    print(f" Anomaly detection (scoring, state and publish) took {anomaly_seconds:.2f}s of {elapsed:.2f}s "
+          f"({anomaly_seconds / elapsed * 100:.1f}% of the transformation)")
+    
+    return {'silver_key': silver_key, 'rows': len(df_clean)}
+
+def main():
+    """
+    Run the transformation for the default bucket
+    """
+    run_transformation()
 
 if __name__ == "__main__":
     main()